@@ -0,0 +1,77 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""
+Benchmark for the calculation of the occurences of large sessions, with
+the simple periodic rules expanded by srules.expander or by dateutil
+
+usage: PYTHONPATH=src python benchmarks/expander_bench.py [years]
+"""
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import datetime
+import sys
+import time
+
+from dateutil import rrule
+
+from srules import Session
+from srules import session
+
+
+def build_session(years):
+    """week days from 08:00 to 18:00 and the first saturday of each
+    month, during *years* years
+    """
+    dtstart = datetime.date(2011, 1, 3)
+    until = datetime.date(2011 + years, 1, 1)
+    work = Session("Work", duration=60*10, start_hour=8, start_minute=0)
+    work.add_rule("week days", freq=rrule.WEEKLY, dtstart=dtstart,
+                  until=until, byweekday=(0, 1, 2, 3, 4))
+    work.add_rule("first saturdays", freq=rrule.DAILY, dtstart=dtstart,
+                  until=until, byweekday=rrule.SA, bymonthday=range(1, 8))
+    return work
+
+
+def calculate(years, nb_runs=3):
+    """best time of the calculation of the occurences"""
+    elapsed = []
+    for _ in range(nb_runs):
+        work = build_session(years)
+        start = time.time()
+        work.occurences
+        elapsed.append(time.time() - start)
+    return min(elapsed), len(work)
+
+
+def main(years=20):
+    expand_rules = session.expand_rules
+    for label, expand in (("dateutil", lambda rules: None),
+                          ("expander", expand_rules)):
+        session.expand_rules = expand
+        elapsed, size = calculate(years)
+        print("%s: %8.2f ms, %d occurences" % (label, 1000 * elapsed, size))
+    session.expand_rules = expand_rules
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,93 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""
+Benchmark for Interval class: memory per Interval and sort throughput
+
+compares the slotted Interval with the former dict-based Interval
+(ordered by a python-level comparaison function on the start date)
+
+usage: PYTHONPATH=src python benchmarks/interval_bench.py [nb_intervals]
+"""
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import datetime
+import random
+import sys
+import time
+
+from srules import Interval
+
+
+class LegacyInterval(object):
+    """former Interval implementation: per-instance __dict__ and
+    comparaison done in python on the start date (was __cmp__)
+    """
+    start = None
+    end = None
+    rank = None
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+    def __lt__(self, other):
+        return (self.start > other.start) - (self.start < other.start) < 0
+
+
+def size_of(interv):
+    """bytes used by an Interval object (datetimes are shared, not counted)
+    """
+    size = sys.getsizeof(interv)
+    if hasattr(interv, '__dict__'):
+        size += sys.getsizeof(interv.__dict__)
+    return size
+
+
+def bench(klass, starts, key=None):
+    intervals = [klass(start, start + datetime.timedelta(hours=8))
+                 for start in starts]
+    size = size_of(intervals[0])
+    begin = time.time()
+    sorted(intervals, key=key)
+    elapsed = time.time() - begin
+    return size, len(intervals) / elapsed
+
+
+def main(nb_intervals=200000):
+    random.seed(42)
+    origin = datetime.datetime(2011, 1, 1)
+    starts = [origin + datetime.timedelta(minutes=random.randint(0, 10**7))
+              for _ in range(nb_intervals)]
+
+    print("%d intervals" % nb_intervals)
+    for label, klass, key in (
+            ("before (dict, python cmp)", LegacyInterval, None),
+            ("after  (slots, __lt__)   ", Interval, None),
+            ("after  (slots, key)      ", Interval, Interval.key)):
+        size, throughput = bench(klass, starts, key)
+        print("%s: %4d bytes/interval, %10.0f intervals sorted/s" %
+              (label, size, throughput))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,104 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""
+Benchmark for the lookups on a multi-year SRules
+(next_interval, prev_interval)
+
+usage: PYTHONPATH=src python benchmarks/lookup_bench.py [years] [queries]
+"""
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import datetime
+import random
+import sys
+import time
+
+from dateutil import rrule
+
+from srules import Session, SRules
+
+
+def build_srules(years):
+    """work on week days from 08:00 to 18:00, except 3 weeks of holidays
+    every year, during *years* years
+    """
+    dtstart = datetime.date(2011, 1, 3)
+    until = datetime.date(2011 + years, 1, 1)
+    work = Session("Work", duration=60*10, start_hour=8, start_minute=0)
+    work.add_rule("week days", freq=rrule.WEEKLY, dtstart=dtstart,
+                  until=until, byweekday=(0, 1, 2, 3, 4))
+    holidays = Session("Holidays", session_type='exclude',
+                       duration=60*24*21, start_hour=0, start_minute=0)
+    holidays.add_rule("summer", freq=rrule.YEARLY, dtstart=dtstart,
+                      until=until, bymonth=8, bymonthday=1)
+    my_srules = SRules("Bench")
+    my_srules.add_session(work)
+    my_srules.add_session(holidays)
+    return my_srules
+
+
+def scan_next_interval(occurences, the_date):
+    """next_interval as a linear scan (former implementation)
+    """
+    return_next = False
+    for elt in occurences:
+        if return_next:
+            return elt
+        if the_date in elt:
+            return elt
+        if elt.end < the_date:
+            continue
+        if elt.start > the_date:
+            return elt
+        return_next = True
+    return None
+
+
+def timed(function, dates):
+    begin = time.time()
+    for the_date in dates:
+        function(the_date)
+    return len(dates) / (time.time() - begin)
+
+
+def main(years=10, nb_queries=2000):
+    random.seed(42)
+    my_srules = build_srules(years)
+    origin = my_srules.occurences[0].start
+    span = int((my_srules.occurences[-1].end - origin).total_seconds())
+    dates = [origin + datetime.timedelta(seconds=random.randint(0, span))
+             for _ in range(nb_queries)]
+
+    print("%d years, %d intervals, %d queries" %
+          (years, len(my_srules), nb_queries))
+    occurences = my_srules.occurences
+    for label, function in (
+            ("linear scan  ", lambda d: scan_next_interval(occurences, d)),
+            ("next_interval", my_srules.next_interval),
+            ("prev_interval", my_srules.prev_interval),
+            ("in           ", my_srules.__contains__)):
+        print("%s: %10.0f queries/s" % (label, timed(function, dates)))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
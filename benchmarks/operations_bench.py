@@ -0,0 +1,114 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""
+Benchmark for the Session operators (union, difference, intersection)
+
+usage: PYTHONPATH=src python benchmarks/operations_bench.py [nb_intervals]
+                                                            [nb_sessions]
+"""
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import datetime
+import random
+import sys
+import time
+
+from srules import Interval, CalculatedSession, IntervalArray
+from srules.operations import union
+
+
+def random_session(nb_intervals, max_duration=600, spread=None):
+    """CalculatedSession of random (possibly overlapping) Intervals
+    """
+    origin = datetime.datetime(2011, 8, 20)
+    if spread is None:
+        spread = nb_intervals * max_duration
+    occurences = []
+    for _ in range(nb_intervals):
+        start = origin + datetime.timedelta(minutes=random.randint(0, spread))
+        occurences.append(Interval(
+            start,
+            start + datetime.timedelta(
+                minutes=random.randint(1, max_duration))))
+    return CalculatedSession(occurences)
+
+
+def timed(function, *args):
+    begin = time.time()
+    result = function(*args)
+    return result, time.time() - begin
+
+
+def successive_unions(sessions):
+    occurences = []
+    for session in sessions:
+        occurences = list(union(occurences, session.occurences))
+    return occurences
+
+
+def nary_union(sessions):
+    return list(union(*[session.occurences for session in sessions]))
+
+
+def main(nb_intervals=100000, nb_sessions=20):
+    random.seed(42)
+    left = random_session(nb_intervals)
+    right = random_session(nb_intervals)
+    total = len(left) + len(right)
+
+    print("%d x %d intervals" % (len(left), len(right)))
+    for label, function in (("union        (+)", left.__add__),
+                            ("difference   (-)", left.__sub__),
+                            ("intersection (&)", left.__and__)):
+        result, elapsed = timed(function, right)
+        print("%s: %6.3fs, %10.0f input intervals/s, %d intervals" %
+              (label, elapsed, total / elapsed, len(result)))
+
+    # sessions of short intervals over the same time range
+    try:
+        left_array = IntervalArray.from_intervals(left)
+        right_array = IntervalArray.from_intervals(right)
+    except ImportError:
+        print("IntervalArray: numpy is not installed")
+    else:
+        print("IntervalArray: %d bytes per interval" %
+              (left_array.nbytes // len(left_array)))
+        for label, function in (("union        (+)", left_array.__add__),
+                                ("difference   (-)", left_array.__sub__),
+                                ("intersection (&)", left_array.__and__)):
+            result, elapsed = timed(function, right_array)
+            print("%s: %6.3fs, %10.0f input intervals/s, %d intervals" %
+                  (label, elapsed, total / elapsed, len(result)))
+
+    sessions = [random_session(nb_intervals // nb_sessions, 60,
+                               nb_intervals * 600)
+                for _ in range(nb_sessions)]
+    print("%d sessions x %d intervals" % (nb_sessions, len(sessions[0])))
+    for label, function in (("successive unions", successive_unions),
+                            ("n-ary union      ", nary_union)):
+        result, elapsed = timed(function, sessions)
+        print("%s: %6.3fs, %d intervals" % (label, elapsed, len(result)))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,70 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""
+Benchmark for the recalculation of a multi-year SRules after a small edit
+(one holiday added to the exclude session)
+
+usage: PYTHONPATH=src python benchmarks/recalculate_bench.py [years] [edits]
+"""
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import datetime
+import sys
+import time
+
+from dateutil import rrule
+
+from lookup_bench import build_srules
+
+
+def add_holidays(my_srules, nb_edits, full):
+    """add *nb_edits* single day holidays, one at a time, and returns the
+    mean time of a recalculation
+    """
+    holidays = my_srules.sessions[1]
+    elapsed = 0
+    for pos in range(nb_edits):
+        holidays.add_rule("", freq=rrule.DAILY, count=1,
+                          dtstart=datetime.date(2012, 3, 1) +
+                          datetime.timedelta(days=7 * pos))
+        holidays.occurences
+        if full:
+            my_srules._checkpoints = []
+        start = time.time()
+        my_srules._recalculate_occurences()
+        elapsed += time.time() - start
+    return elapsed / nb_edits
+
+
+def main(years=10, nb_edits=20):
+    print("%d years, %d intervals, %d edits" %
+          (years, len(build_srules(years)), nb_edits))
+    for label, full in (("full        ", True),
+                        ("dirty range ", False)):
+        print("%s: %8.2f ms per recalculation" %
+              (label, 1000 * add_holidays(build_srules(years), nb_edits,
+                                          full)))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
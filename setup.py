@@ -27,5 +27,6 @@ setup(name='srules',
       package_dir={'': 'src'},
       include_package_data=True,
       zip_safe=False,
-      install_requires=install_requires, )
+      install_requires=install_requires,
+      extras_require={'numpy': ['numpy']}, )
 
@@ -41,5 +41,8 @@ Useful URL:
 from srules.interval import Interval
 from srules.session import Session, CalculatedSession
 from srules.schedule import SRules
+from srules.expression import Expression
+from srules.intervalarray import IntervalArray
 
-__all__ = 'Interval Session CalculatedSession SRules'.split()
+__all__ = ('Interval Session CalculatedSession SRules Expression '
+           'IntervalArray').split()
@@ -0,0 +1,271 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""expander module
+
+Expansion of the simple periodic rules without dateutil.
+
+dateutil builds each occurence of a rrule through its generic iterator
+(year masks, week masks, filters for every *byxxx* parameter), which is the
+main cost of the calculation of large sessions. The rules a Session
+usually has are much simpler: every *interval* days or weeks, on some week
+days or month days, up to a *count* or an *until* date. Their occurences
+are generated here by adding fixed timedeltas to the first date.
+
+Any other rule (other frequency, *byhour*, *bysetpos*, no bound, time
+zones, ...) is not expanded here (None is returned): the caller falls back
+to dateutil. The occurences are the same as dateutil's (see
+tests/expander_test.py).
+
+Contains:
+* expand
+* expand_rules
+"""
+from __future__ import absolute_import
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import calendar
+import datetime
+
+from dateutil import rrule
+
+# the rrule parameters understood by expand ('cache' does not change the
+# occurences)
+_SUPPORTED = frozenset(['freq', 'dtstart', 'interval', 'wkst', 'count',
+                        'until', 'byweekday', 'bymonthday', 'cache'])
+
+
+def _as_datetime(the_date):
+    """returns a date as a datetime at midnight (as dateutil does), or the
+    datetime itself
+    """
+    if isinstance(the_date, datetime.datetime):
+        return the_date
+    return datetime.datetime.fromordinal(the_date.toordinal())
+
+
+def _as_tuple(value):
+    """returns a single value (int or weekday) or a sequence of values as a
+    tuple, or None
+    """
+    if isinstance(value, (int, rrule.weekday)):
+        return (value,)
+    try:
+        return tuple(value)
+    except TypeError:
+        return None
+
+
+def _weekdays(byweekday):
+    """returns the set of the week days (0 is monday) of a *byweekday*
+    parameter, or None if it is not supported
+
+    (the *n* of the weekday instances, like MO(+1), is ignored by dateutil
+    for the daily and weekly frequencies)
+    """
+    wdays = _as_tuple(byweekday)
+    if wdays is None:
+        return None
+    weekdays = set()
+    for wday in wdays:
+        if isinstance(wday, bool):
+            return None
+        if isinstance(wday, int):
+            weekdays.add(wday)
+        elif isinstance(wday, rrule.weekday):
+            weekdays.add(wday.weekday)
+        else:
+            return None
+    return weekdays
+
+
+def _match_monthday(the_date, monthdays, nmonthdays):
+    """True if the date is one of the month days (positive: from the first
+    day of the month, negative: from the last one)
+    """
+    if the_date.day in monthdays:
+        return True
+    if nmonthdays:
+        month_length = calendar.monthrange(the_date.year, the_date.month)[1]
+        return the_date.day - month_length - 1 in nmonthdays
+    return False
+
+
+def expand(rrule_params):
+    """returns the occurences of a rule, as the list of the datetimes
+    dateutil would give, or None if the rule is not a simple periodic one
+
+    Supported: DAILY and WEEKLY frequencies, with *dtstart*, *interval*,
+    *wkst*, *byweekday*, *bymonthday*, and *count* and/or *until* (naive
+    datetimes or dates only).
+
+    usage example:
+
+      .. code-block:: python
+
+        expand({'freq': rrule.WEEKLY, 'byweekday': (0, 2, 4),
+                'dtstart': datetime.datetime(2011, 8, 22, 8),
+                'until': datetime.datetime(2012, 8, 22)})
+
+    *Args:*
+      :rrule_params: (dict) : the parameters of a dateutil rrule
+
+    *Returns:*
+      :list: the sorted datetimes of the occurences, or None
+
+    """
+    if not set(rrule_params) <= _SUPPORTED:
+        return None
+    freq = rrule_params.get('freq')
+    if freq not in (rrule.DAILY, rrule.WEEKLY):
+        return None
+    dtstart = rrule_params.get('dtstart')
+    if not isinstance(dtstart, datetime.date):
+        # (no dtstart: dateutil starts now)
+        return None
+    dtstart = _as_datetime(dtstart).replace(microsecond=0)
+    if dtstart.year == datetime.MINYEAR:
+        # (the first week could start before year 1)
+        return None
+    until = rrule_params.get('until')
+    if until is not None:
+        if not isinstance(until, datetime.date):
+            return None
+        until = _as_datetime(until)
+    count = rrule_params.get('count')
+    if count is None and not until:
+        # (open-ended rule)
+        return None
+    if count is not None and (isinstance(count, bool) or
+                              not isinstance(count, int)):
+        return None
+    if dtstart.tzinfo is not None or \
+            (until is not None and until.tzinfo is not None):
+        return None
+    interval = rrule_params.get('interval', 1)
+    if isinstance(interval, bool) or not isinstance(interval, int) or \
+            interval < 1:
+        return None
+    wkst = rrule_params.get('wkst')
+    if wkst is None:
+        wkst = calendar.firstweekday()
+    elif isinstance(wkst, rrule.weekday):
+        wkst = wkst.weekday
+    elif isinstance(wkst, bool) or not isinstance(wkst, int):
+        return None
+
+    byweekday = rrule_params.get('byweekday')
+    bymonthday = rrule_params.get('bymonthday')
+    if freq == rrule.WEEKLY and byweekday is None and bymonthday is None:
+        byweekday = dtstart.weekday()
+    weekdays = None
+    if byweekday is not None:
+        weekdays = _weekdays(byweekday)
+        if weekdays is None:
+            return None
+        if not weekdays:
+            # (as dateutil: no filter)
+            weekdays = None
+    monthdays = nmonthdays = None
+    if bymonthday is not None:
+        values = _as_tuple(bymonthday)
+        if values is None or \
+                any(isinstance(value, bool) or not isinstance(value, int)
+                    for value in values):
+            return None
+        monthdays = set(value for value in values if value > 0)
+        nmonthdays = set(value for value in values if value < 0)
+        if not monthdays and not nmonthdays:
+            # (as dateutil: no filter)
+            monthdays = nmonthdays = None
+
+    # the candidate days are the days of the periods (1 day or 1 week)
+    # starting every *interval* periods: timedeltas from the period start
+    if freq == rrule.WEEKLY:
+        period_start = dtstart - datetime.timedelta(
+            days=(dtstart.weekday() - wkst) % 7)
+        offsets = [datetime.timedelta(days=day) for day in range(7)
+                   if weekdays is None or (wkst + day) % 7 in weekdays]
+        stride = datetime.timedelta(days=7 * interval)
+        weekdays = None  # (already filtered by the offsets)
+    else:
+        period_start = dtstart
+        offsets = [datetime.timedelta(0)]
+        stride = datetime.timedelta(days=interval)
+
+    occurences = []
+    if not offsets or (count is not None and count <= 0):
+        return occurences
+    try:
+        while True:
+            for offset in offsets:
+                occ = period_start + offset
+                if occ < dtstart:
+                    continue
+                if until and occ > until:
+                    return occurences
+                if weekdays is not None and occ.weekday() not in weekdays:
+                    continue
+                if monthdays is not None and \
+                        not _match_monthday(occ, monthdays, nmonthdays):
+                    continue
+                occurences.append(occ)
+                if count is not None and len(occurences) == count:
+                    return occurences
+            period_start += stride
+    except OverflowError:
+        # (after year 9999, as dateutil)
+        return occurences
+
+
+def expand_rules(rules):
+    """returns the occurences of a set of rules, as the sorted list of the
+    datetimes the dateutil rruleset would give, or None if one of the rules
+    is not supported by :py:func:`expander.expand`
+
+    *Args:*
+      :rules: (list) : the rules of a Session (dicts with the *type*,
+              'add' or 'exclude', and the *rule* parameters, see
+              :py:attr:`schedule.Session.rules`)
+
+    *Returns:*
+      :list: the sorted datetimes of the occurences, or None
+
+    """
+    adds = []
+    excludes = []
+    for rule in rules:
+        occurences = expand(rule['rule'])
+        if occurences is None:
+            return None
+        if rule['type'] == 'exclude':
+            excludes.append(occurences)
+        else:
+            adds.append(occurences)
+    if len(adds) == 1 and not excludes:
+        return adds[0]
+    occurences = set()
+    for add in adds:
+        occurences.update(add)
+    for exclude in excludes:
+        occurences.difference_update(exclude)
+    return sorted(occurences)
@@ -0,0 +1,384 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""expression module
+
+Lazy expressions on sessions.
+
+The operators of :py:class:`schedule.Session` (+, -, &) build a new
+CalculatedSession for each operation, so *(a + b - c) & d* builds three
+intermediate Interval lists. The same operators on an Expression only
+build the expression tree: it is evaluated once, on demand, by chaining
+the generators of :py:mod:`operations`, and only the final list is built.
+
+usage example:
+
+  .. code-block:: python
+
+    rota = (ses_a.lazy() + ses_b - holidays) & opening_hours
+    result = rota.evaluate()  # a CalculatedSession
+
+The result of each node is kept, and reused as long as the sessions of the
+expression do not change: evaluating *rota + extra* after *rota* does not
+calculate *rota* again.
+
+The results are the same as the ones of the Session operators. Chains of
+'+' are merged in a single n-ary union, and the expression is walked
+without recursion: long chains of operators are supported (the results of
+the deepest nodes are built, so the generators are not nested too deeply).
+
+Contains:
+* Expression
+"""
+from __future__ import absolute_import
+from builtins import object
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+from heapq import heappush, heappop
+from itertools import chain
+
+from .session import Session, CalculatedSession, _occurences_of
+from .operations import union, difference, intersection
+
+# maximum number of nested operations streamed together: the results of
+# deeper nodes are built (see Expression._prepare)
+_MAX_DEPTH = 50
+
+
+def _flat_versions(versions):
+    """returns the versions of the sessions of a node, nested by operand
+    (see Expression._prepare), as a flat tuple
+    """
+    flat = []
+    stack = [versions]
+    while stack:
+        versions = stack.pop()
+        if isinstance(versions, tuple):
+            stack.extend(reversed(versions))
+        else:
+            flat.append(versions)
+    return tuple(flat)
+
+
+def _add(iterables):
+    """union of the operands of consecutive '+' operators, as the
+    :py:meth:`schedule.Session.__add__` operator gives it: merged, unless
+    only one operand is not empty (it is then returned as it is)
+    """
+    iterators = []
+    for iterable in iterables:
+        iterator = iter(iterable)
+        first = next(iterator, None)
+        if first is not None:
+            iterators.append(chain((first, ), iterator))
+    if len(iterators) == 1:
+        return iterators[0]
+    return union(*iterators)
+
+
+def _flatten(node, flats):
+    """returns the operands of the consecutive unions from an 'add' node
+    (the 'add' nodes in *flats*), from left to right
+    """
+    operands = []
+    stack = list(reversed(node.operands))
+    while stack:
+        operand = stack.pop()
+        if id(operand) in flats:
+            stack.extend(reversed(operand.operands))
+        else:
+            operands.append(operand)
+    return operands
+
+
+def _sorted_difference(left, right):
+    """difference of sorted iterables of Intervals, sorted as the
+    :py:meth:`schedule.Session.__sub__` operator sorts it (the remaining
+    parts of overlapping left Intervals are not always sorted, see
+    :py:func:`operations.difference`)
+
+    The parts of a left Interval never start before it: the parts which
+    start before the current left Interval are yielded, the other ones
+    wait in a heap.
+    """
+    current = [None]
+
+    def tracked(left):
+        for occ in left:
+            current[0] = occ.start
+            yield occ
+
+    heap = []
+    for pos, occ in enumerate(difference(tracked(left), right)):
+        heappush(heap, (occ.start, occ.end, pos, occ))
+        while heap and heap[0][0] < current[0]:
+            yield heappop(heap)[3]
+    while heap:
+        yield heappop(heap)[3]
+
+
+class Expression(object):
+    """lazy result of operators on sessions
+
+    An Expression is either a leaf (a session, Interval or datetime) or an
+    operator ('add', 'sub' or 'and') on other Expressions. It is usually
+    built with :py:meth:`schedule.Session.lazy`, then with the +, - and &
+    operators, which accept the same operands as the ones of
+    :py:class:`schedule.Session` (and Expressions).
+
+    *Args:*
+      :operator: (string) : 'add', 'sub', 'and', or None for a leaf
+      :operands: (tuple) : the Expressions of the operator, or the Session
+                           (or Interval list) of a leaf
+
+    """
+    def __init__(self, operator=None, operands=()):
+        self.operator = operator
+        self.operands = operands
+
+        # result of the last evaluation, and versions of the sessions used
+        self._result = None
+        self._versions = None
+
+    @classmethod
+    def _of(cls, other):
+        """returns an Expression for an operand of the operators
+        """
+        if isinstance(other, Expression):
+            return other
+        if other is None:
+            return cls(None, ([], ))
+        if isinstance(other, Session):
+            return cls(None, (other, ))
+        occurences = _occurences_of(other)
+        if occurences is None:
+            raise TypeError("Can not calculate Expression and %s" %
+                            type(other))
+        return cls(None, (occurences, ))
+
+    def __add__(self, other):
+        """'+' operator: lazy union (see :py:meth:`schedule.Session.__add__`)
+        """
+        return Expression('add', (self, Expression._of(other)))
+
+    def __sub__(self, other):
+        """'-' operator: lazy difference
+        (see :py:meth:`schedule.Session.__sub__`)
+        """
+        return Expression('sub', (self, Expression._of(other)))
+
+    def __and__(self, other):
+        """'&' operator: lazy intersection
+        (see :py:meth:`schedule.Session.__and__`)
+        """
+        return Expression('and', (self, Expression._of(other)))
+
+    def _walk(self):
+        """returns the nodes of the expression, each one after its operands
+
+        The tree is walked with a stack (no recursion), so long chains of
+        operators are supported.
+        """
+        nodes = []
+        seen = set()
+        stack = [(self, False)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                nodes.append(node)
+                continue
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            stack.append((node, True))
+            if node.operator is not None:
+                for operand in reversed(node.operands):
+                    stack.append((operand, False))
+        return nodes
+
+    def _prepare(self):
+        """prepare the evaluation of all the nodes, in a single walk
+
+        returns a dict, for each node (by id), of:
+
+        * the versions of the sessions of the node (their occurences are
+          calculated if needed), nested by operand: they are only
+          flattened (see _flat_versions) when they are compared
+        * a function returning a new generator of the resulting Intervals
+          (the result of the last evaluation if it is still valid)
+
+        The results of the nodes more than _MAX_DEPTH generators deep are
+        built (and kept), so the generators are never nested too deeply.
+        """
+        plan = {}
+        # (True if the result has no overlapping Intervals, True if it is
+        # known to be not empty, and the number of nested generators)
+        info = {}
+        # for the 'add' nodes: how many operands of their consecutive
+        # unions are known to be not empty, True if none of them overlaps,
+        # and their max number of nested generators
+        flats = {}
+        # for the 'sub' nodes: True if the left operand of their
+        # consecutive differences has no overlapping Intervals, and the
+        # max number of nested generators of the operands
+        subs = {}
+        for node in self._walk():
+            if node.operator is None:
+                operand = node.operands[0]
+                if isinstance(operand, Session):
+                    occurences = operand.occurences  # (calculated if needed)
+                    plan[id(node)] = (
+                        (operand._version, ),
+                        lambda operand=operand: iter(operand.occurences))
+                else:
+                    occurences = operand
+                    plan[id(node)] = ((), lambda operand=operand:
+                                      iter(operand))
+                info[id(node)] = (False, len(occurences) > 0, 0)
+                continue
+
+            versions = tuple(plan[id(operand)][0]
+                             for operand in node.operands)
+            result = node._cached(versions)
+            if result is not None:
+                plan[id(node)] = (versions, lambda result=result:
+                                  iter(result))
+                info[id(node)] = (True, len(result) > 0, 0)
+                continue
+
+            if node.operator == 'add':
+                # (the consecutive unions are accumulated from the
+                # operands: a long chain is prepared in linear time, and
+                # its operands are only listed when the union is built)
+                not_empty = 0
+                all_disjoint = True
+                depth = 0
+                for operand in node.operands:
+                    if id(operand) in flats:
+                        operand_not_empty, operand_disjoint, operand_depth = \
+                            flats[id(operand)]
+                    else:
+                        operand_disjoint, operand_not_empty, operand_depth = \
+                            info[id(operand)]
+                    not_empty += operand_not_empty
+                    all_disjoint = all_disjoint and operand_disjoint
+                    depth = max(depth, operand_depth)
+                flats[id(node)] = (not_empty, all_disjoint, depth)
+                depth += 1
+                # (merged, unless only one operand is not empty)
+                disjoint = not_empty > 1 or all_disjoint
+                info[id(node)] = (disjoint, not_empty > 0, None)
+
+                def factory(node=node):
+                    return _add([plan[id(operand)][1]()
+                                 for operand in _flatten(node, flats)])
+            elif node.operator == 'sub':
+                # (a - b) - c is a - (b + c): the consecutive differences
+                # are accumulated as the unions
+                left, right = node.operands
+                if id(left) in subs:
+                    disjoint, depth = subs[id(left)]
+                else:
+                    disjoint, _, depth = info[id(left)]
+                depth = max(depth, info[id(right)][2])
+                subs[id(node)] = (disjoint, depth)
+                depth += 1
+                info[id(node)] = (disjoint, False, None)
+
+                def factory(node=node, disjoint=disjoint):
+                    rights = []
+                    while True:
+                        left, right = node.operands
+                        rights.append(plan[id(right)][1]())
+                        if id(left) not in subs:
+                            break
+                        node = left
+                    right = union(*rights)
+                    if disjoint:
+                        return difference(plan[id(left)][1](), right)
+                    return _sorted_difference(plan[id(left)][1](), right)
+            else:
+                left, right = [plan[id(operand)][1]
+                               for operand in node.operands]
+                info[id(node)] = (True, False, None)
+
+                def factory(left=left, right=right):
+                    return intersection(left(), right())
+                depth = 1 + max(info[id(operand)][2]
+                                for operand in node.operands)
+            if depth > _MAX_DEPTH:
+                result = list(factory())
+                node._result = result
+                node._versions = versions = _flat_versions(versions)
+                flats.pop(id(node), None)
+                subs.pop(id(node), None)
+                plan[id(node)] = (versions, lambda result=result:
+                                  iter(result))
+                info[id(node)] = (info[id(node)][0], len(result) > 0, 0)
+            else:
+                plan[id(node)] = (versions, factory)
+                info[id(node)] = info[id(node)][:2] + (depth, )
+        return plan
+
+    def _cached(self, versions):
+        """returns the result of the last evaluation if the sessions did
+        not change since, else None
+        """
+        if self._versions is not None and \
+                self._versions == _flat_versions(versions):
+            return self._result
+        return None
+
+    def _iter(self):
+        """returns a generator of the resulting Intervals: the result of
+        the last evaluation if it is still valid, else the streaming
+        operations on the operands
+        """
+        return self._prepare()[id(self)][1]()
+
+    def evaluate(self):
+        """returns the result of the expression
+
+        The result is calculated at first call, then kept until a session
+        of the expression changes.
+
+        *Returns:*
+          :CalculatedSession: a :py:class:`schedule.CalculatedSession`
+
+        """
+        versions, factory = self._prepare()[id(self)]
+        result = self._cached(versions)
+        if result is None:
+            result = list(factory())
+            if self.operator is not None:
+                self._result = result
+                self._versions = _flat_versions(versions)
+        return CalculatedSession._from_sorted(result)
+
+    def __iter__(self):
+        """iterate over the resulting Intervals, without building the
+        result (if it is not already calculated)
+        """
+        return self._iter()
+
+    def __contains__(self, other):
+        return other in self.evaluate()
@@ -22,7 +22,6 @@
 Contains:
 * Interval
 """
-from past.builtins import cmp
 from builtins import str
 from builtins import object
 
@@ -31,6 +30,7 @@ __authors__ = [
     'Thomas Chiroux', ]
 
 import datetime
+from operator import attrgetter
 
 
 class Interval(object):
@@ -40,10 +40,14 @@ class Interval(object):
         :start:   represent the datetime of the period start
         :end:     represent the datetime of the period end
 
+    Intervals are immutable (once created, *start* and *end* can not be
+    changed) and use ``__slots__``, so they do not carry a per-instance
+    ``__dict__``: a Session can hold a lot of them.
+
+    Intervals are ordered by (start, end).
+
     """
-    start = None
-    end = None
-    rank = None
+    __slots__ = ('start', 'end')
 
     def __init__(self, start, end):
         """Interval Constructor
@@ -58,8 +62,19 @@ class Interval(object):
         if start > end:
             raise ValueError('Start (%s) must not be greater than end (%s)' %
                              (start, end))
-        self.start = start
-        self.end = end
+        object.__setattr__(self, 'start', start)
+        object.__setattr__(self, 'end', end)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("'Interval' object is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("'Interval' object is immutable")
+
+    def __reduce__(self):
+        """pickle support (needed because of __slots__ and immutability)
+        """
+        return (Interval, (self.start, self.end))
 
     def __unicode__(self):
         """Returns unicode string describting the objects and his content
@@ -74,6 +89,8 @@ class Interval(object):
         """
         return u"%s --> %s" % (self.start, self.end)
 
+    __str__ = __unicode__
+
     def __repr__(self):
         """Representation of object
 
@@ -84,7 +101,7 @@ class Interval(object):
           :string: string representation of an :py:class:`schedule.Interval`
 
         """
-        return str(self).encode('utf-8')
+        return str(self)
 
     def __eq__(self, other):
         """'==' operator
@@ -100,13 +117,19 @@ class Interval(object):
           :boolean: True if equal, False if not
 
         """
-        if self.start == other.start and self.end == other.end:
-            return True
-        else:
-            return False
+        if not isinstance(other, Interval):
+            return NotImplemented
+        return self.start == other.start and self.end == other.end
 
-    def __cmp__(self, other):
-        """comparaison operator
+    def __ne__(self, other):
+        """'!=' operator (see :py:meth:`schedule.Interval.__eq__`)
+        """
+        if not isinstance(other, Interval):
+            return NotImplemented
+        return self.start != other.start or self.end != other.end
+
+    def __lt__(self, other):
+        """comparaison operators
 
         *Usage example:*
 
@@ -118,12 +141,37 @@ class Interval(object):
             if Interval1 <= Interval2:
               ...
 
-        .. warning:: The comparaison operator only compare the start date of
-           the interval: because Interval can supoerpose each others, it is not
-           possible to compare the full interval. Be careful when using
-           comparaisons
+        Intervals are compared on their (start, end) tuple: the start date
+        first, then the end date for Intervals starting at the same time.
+
+        .. warning:: because Interval can superpose each others, this order
+           does not mean that an Interval is entirely before another one. Be
+           careful when using comparaisons
         """
-        return cmp(self.start, other.start)
+        if not isinstance(other, Interval):
+            return NotImplemented
+        return (self.start, self.end) < (other.start, other.end)
+
+    def __le__(self, other):
+        if not isinstance(other, Interval):
+            return NotImplemented
+        return (self.start, self.end) <= (other.start, other.end)
+
+    def __gt__(self, other):
+        if not isinstance(other, Interval):
+            return NotImplemented
+        return (self.start, self.end) > (other.start, other.end)
+
+    def __ge__(self, other):
+        if not isinstance(other, Interval):
+            return NotImplemented
+        return (self.start, self.end) >= (other.start, other.end)
+
+    #: sort key of the Intervals: a (start, end) tuple.
+    #: It's a C-level getter, so big lists of Intervals can be sorted
+    #: without any python-level comparaison:
+    #: ``sorted(intervals, key=Interval.key)``
+    key = staticmethod(attrgetter('start', 'end'))
 
     def __contains__(self, other):
         """'in' operator
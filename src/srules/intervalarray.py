@@ -0,0 +1,378 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""intervalarray module
+
+Compact storage of sorted Intervals, based on *numpy* (optional
+dependency: the rest of srules does not need it).
+
+An :py:class:`intervalarray.IntervalArray` keeps the start and end dates
+of its Intervals in two *datetime64* arrays (16 bytes per Interval, instead
+of an Interval object and two datetime objects), and implements the set
+operations of :py:mod:`operations` and the membership test as vectorized
+operations.
+
+usage example:
+
+  .. code-block:: python
+
+    work = IntervalArray.from_intervals(my_srules.occurences)
+    holidays = IntervalArray.from_intervals(my_holidays.occurences)
+    worked = work - holidays
+    calc_session = CalculatedSession(worked)
+
+A :py:class:`schedule.CalculatedSession` built from an IntervalArray keeps
+it as its occurences: the Intervals are only created when they are read
+(indexing, iteration), and the lookups search the date arrays directly.
+
+Dependencies:
+    numpy : http://numpy.scipy.org
+
+Contains:
+* IntervalArray
+* bisect_left
+* bisect_right
+"""
+from __future__ import absolute_import
+from builtins import object
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import bisect
+import datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .interval import Interval
+
+_DTYPE = 'datetime64[us]'
+# (the dates are searched as integers: microseconds since the epoch)
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def bisect_left(dates, the_date, low=0, high=None):
+    """same as *bisect.bisect_left*, searched by numpy in the index of an
+    IntervalArray (see :py:meth:`intervalarray.IntervalArray._get_index`)
+    """
+    if type(dates) is _DateColumn:
+        return dates.search(the_date, 'left', low, high)
+    if high is None:
+        return bisect.bisect_left(dates, the_date, low)
+    return bisect.bisect_left(dates, the_date, low, high)
+
+
+def bisect_right(dates, the_date, low=0, high=None):
+    """same as *bisect.bisect_right*, searched by numpy in the index of an
+    IntervalArray (see :py:meth:`intervalarray.IntervalArray._get_index`)
+    """
+    if type(dates) is _DateColumn:
+        return dates.search(the_date, 'right', low, high)
+    if high is None:
+        return bisect.bisect_right(dates, the_date, low)
+    return bisect.bisect_right(dates, the_date, low, high)
+
+
+class _DateColumn(object):
+    """read-only sequence of the dates of a datetime64 array, as datetime
+
+    Used as the search index of the occurences (see
+    :py:meth:`schedule.Session._get_index`): the dates are only converted
+    when they are read, and searched by numpy (see
+    :py:func:`intervalarray.bisect_left`).
+    """
+    __slots__ = ('dates', 'values')
+
+    def __init__(self, dates):
+        self.dates = dates
+        self.values = dates.view('int64')
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.dates[item].tolist()
+        return self.dates.item(item)
+
+    def search(self, the_date, side, low=0, high=None):
+        """position of *the_date* in the dates (see *numpy.searchsorted*),
+        between *low* and *high*
+        """
+        values = self.values
+        if low or high is not None:
+            values = values[low:high]
+        return low + int(values.searchsorted(
+            (the_date - _EPOCH) // _MICROSECOND, side))
+
+
+class IntervalArray(object):
+    """sorted Intervals stored as two numpy arrays of dates
+
+    The Intervals are sorted by start date (then end date), as the
+    occurences of a :py:class:`schedule.Session`. An IntervalArray is
+    immutable: the operations return new IntervalArrays.
+
+    The operations give the same results as the ones of
+    :py:mod:`operations` (and of the Session operators):
+
+    * *a + b* : union (see :py:func:`operations.union`)
+    * *a - b* : difference (see :py:func:`operations.difference`), the
+      Intervals of *a* should not overlap each other
+    * *a & b* : intersection (see :py:func:`operations.intersection`)
+
+    *Args:*
+      :starts: the start dates (array-like of datetime or datetime64)
+      :ends: the end dates, in the same order
+
+    """
+    __slots__ = ('starts', 'ends', '_max_ends')
+
+    def __init__(self, starts=(), ends=()):
+        if numpy is None:
+            raise ImportError("IntervalArray requires numpy")
+        starts = numpy.asarray(starts, dtype=_DTYPE)
+        ends = numpy.asarray(ends, dtype=_DTYPE)
+        if starts.shape != ends.shape:
+            raise ValueError("starts and ends should have the same length")
+        if (ends < starts).any():
+            raise ValueError("the Intervals should end after their start")
+        order = numpy.lexsort((ends, starts))
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self._max_ends = None
+
+    @classmethod
+    def _from_sorted(cls, starts, ends):
+        """build an IntervalArray from arrays already sorted"""
+        array = cls.__new__(cls)
+        array.starts = starts
+        array.ends = ends
+        array._max_ends = None
+        return array
+
+    @classmethod
+    def from_intervals(cls, occurences):
+        """build an IntervalArray from Intervals (a list, a Session, ...)
+
+        *Args:*
+          :occurences: iterable of Intervals
+
+        *Returns:*
+          :IntervalArray: a new IntervalArray
+
+        """
+        occurences = list(occurences)
+        return cls([occ.start for occ in occurences],
+                   [occ.end for occ in occurences])
+
+    def to_intervals(self):
+        """returns the list of the Intervals (as in *Session.occurences*)
+        """
+        return [Interval(start, end) for start, end in
+                zip(self.starts.astype(object), self.ends.astype(object))]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        for start, end in zip(self.starts.astype(object),
+                              self.ends.astype(object)):
+            yield Interval(start, end)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return IntervalArray._from_sorted(self.starts[item],
+                                              self.ends[item])
+        return Interval(self.starts.item(item), self.ends.item(item))
+
+    def __eq__(self, other):
+        if isinstance(other, list):
+            # (as the occurences of a Session)
+            return len(self) == len(other) and \
+                all(occ == other_occ for occ, other_occ in zip(self, other))
+        if not isinstance(other, IntervalArray):
+            return NotImplemented
+        return (numpy.array_equal(self.starts, other.starts) and
+                numpy.array_equal(self.ends, other.ends))
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "IntervalArray(%d Intervals)" % len(self)
+
+    @property
+    def nbytes(self):
+        """the memory used by the dates, in bytes"""
+        return self.starts.nbytes + self.ends.nbytes
+
+    def _get_max_ends(self):
+        """the max end date of the Intervals up to each one (see
+        :py:meth:`schedule.Session._get_index`)
+        """
+        if self._max_ends is None:
+            self._max_ends = numpy.maximum.accumulate(self.ends)
+        return self._max_ends
+
+    def _get_index(self):
+        """the search index of the Intervals (see
+        :py:meth:`schedule.Session._get_index`), read from the date arrays
+        """
+        return _DateColumn(self.starts), _DateColumn(self._get_max_ends())
+
+    def _get_durations(self):
+        """the cumulative durations of the Intervals, in seconds (see
+        :py:meth:`schedule.Session._get_durations`)
+        """
+        durations = (self.ends - self.starts) // numpy.timedelta64(1, 's')
+        return [0] + numpy.cumsum(durations).tolist()
+
+    def coalesce(self):
+        """returns the IntervalArray where the overlapping (or touching)
+        Intervals are merged
+        """
+        if len(self) < 2:
+            return self
+        max_ends = self._get_max_ends()
+        # a new Interval begins after the end of all the previous ones
+        first = numpy.empty(len(self), dtype=bool)
+        first[0] = True
+        first[1:] = self.starts[1:] > max_ends[:-1]
+        if first.all():
+            return self
+        positions = numpy.flatnonzero(first)
+        last = numpy.append(positions[1:], len(self)) - 1
+        return IntervalArray._from_sorted(self.starts[positions],
+                                          max_ends[last])
+
+    def __add__(self, other):
+        """union (see :py:func:`operations.union`)"""
+        other = IntervalArray._of(other)
+        starts = numpy.concatenate((self.starts, other.starts))
+        ends = numpy.concatenate((self.ends, other.ends))
+        order = numpy.lexsort((ends, starts))
+        return IntervalArray._from_sorted(starts[order],
+                                          ends[order]).coalesce()
+
+    def _overlapping(self, starts, ends, side):
+        """returns, for each Interval (*starts*, *ends*), the positions
+        (low, high) of the Intervals of self (coalesced) which overlap or
+        touch it (*side* 'left'), or only overlap it (*side* 'right')
+        """
+        other_side = 'right' if side == 'left' else 'left'
+        low = numpy.searchsorted(self.ends, starts, side)
+        high = numpy.searchsorted(self.starts, ends, other_side)
+        return low, numpy.maximum(high, low)
+
+    def __sub__(self, other):
+        """difference (see :py:func:`operations.difference`)"""
+        other = IntervalArray._of(other).coalesce()
+        low, high = other._overlapping(self.starts, self.ends, 'left')
+        counts = high - low
+        # each cut Interval gives (counts + 1) pieces, between the other
+        # Intervals which cut it
+        nb_pieces = numpy.where(counts > 0, counts + 1, 1)
+        owner = numpy.repeat(numpy.arange(len(self)), nb_pieces)
+        first_piece = numpy.cumsum(nb_pieces) - nb_pieces
+        rank = numpy.arange(len(owner)) - first_piece[owner]
+        # piece number r of an Interval begins at the end of the (r - 1)th
+        # other Interval, and ends at the start of the rth one
+        other_pos = low[owner] + rank
+        last = rank == nb_pieces[owner] - 1
+        cut = counts[owner] > 0
+        starts = self.starts[owner].copy()
+        ends = self.ends[owner].copy()
+        has_prev = cut & (rank > 0)
+        starts[has_prev] = other.ends[other_pos[has_prev] - 1]
+        has_next = cut & ~last
+        ends[has_next] = other.starts[other_pos[has_next]]
+        starts = numpy.maximum(starts, self.starts[owner])
+        ends = numpy.minimum(ends, self.ends[owner])
+        keep = ~cut | (ends > starts)
+        return IntervalArray._from_sorted(starts[keep], ends[keep])
+
+    def __and__(self, other):
+        """intersection (see :py:func:`operations.intersection`)"""
+        left = self.coalesce()
+        right = IntervalArray._of(other).coalesce()
+        low, high = right._overlapping(left.starts, left.ends, 'left')
+        counts = high - low
+        owner = numpy.repeat(numpy.arange(len(left)), counts)
+        first = numpy.cumsum(counts) - counts
+        other_pos = low[owner] + numpy.arange(len(owner)) - first[owner]
+        starts = numpy.maximum(left.starts[owner], right.starts[other_pos])
+        ends = numpy.minimum(left.ends[owner], right.ends[other_pos])
+        return IntervalArray._from_sorted(starts, ends)
+
+    def contains(self, dates):
+        """vectorized membership test: for each date, True if it is inside
+        (or at the bounds of) an Interval
+
+        *Args:*
+          :dates: array-like of datetime or datetime64
+
+        *Returns:*
+          :numpy array: of booleans, one per date
+
+        """
+        dates = numpy.asarray(dates, dtype=_DTYPE)
+        pos = numpy.searchsorted(self.starts, dates, 'right') - 1
+        if not len(self):
+            return numpy.zeros(dates.shape, dtype=bool)
+        max_ends = self._get_max_ends()
+        return (pos >= 0) & (max_ends[numpy.maximum(pos, 0)] >= dates)
+
+    def __contains__(self, other):
+        """'in' operator, for a datetime or an Interval (inside one of the
+        Intervals)
+        """
+        if isinstance(other, Interval):
+            # (as in Session.__contains__) the first Interval ending after
+            # the other one, does it start before ?
+            pos = numpy.searchsorted(self._get_max_ends(),
+                                     numpy.datetime64(other.end, 'us'))
+            return bool(pos < numpy.searchsorted(
+                self.starts, numpy.datetime64(other.start, 'us'), 'right'))
+        return bool(self.contains([other])[0])
+
+    @classmethod
+    def _of(cls, other):
+        """returns an IntervalArray for an operand of the operators"""
+        if isinstance(other, IntervalArray):
+            return other
+        if isinstance(other, Interval):
+            return cls([other.start], [other.end])
+        if other is None:
+            return cls()
+        # Session, list of Intervals
+        occurences = getattr(other, 'occurences', other)
+        if isinstance(occurences, IntervalArray):
+            return occurences
+        return cls.from_intervals(occurences)
@@ -0,0 +1,241 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""operations module
+
+Set operations on sorted sequences of Intervals, used by the
+:py:class:`schedule.Session` operators.
+
+All the operations take Intervals sorted by start date (as in
+*Session.occurences*) and walk them only once. They are generators: they
+yield the resulting Intervals, sorted and disjoint, one by one.
+
+Contains:
+* union
+* difference
+* intersection
+"""
+from __future__ import absolute_import
+
+from collections import deque
+from heapq import heapify, heappop, heapreplace
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+from .interval import Interval
+
+
+def _merge(*iterables):
+    """merge sorted iterables of Intervals into one sorted generator
+
+    More than two iterables are merged with a heap: O(n log k) for k
+    iterables of n Intervals in total.
+    """
+    if len(iterables) != 2:
+        return _merge_heap(iterables)
+    return _merge_two(*iterables)
+
+
+def _merge_heap(iterables):
+    """k-way merge of sorted iterables of Intervals (see _merge)
+    """
+    # the position of the iterable breaks the ties between equal starts
+    heap = []
+    for pos, iterable in enumerate(iterables):
+        iterator = iter(iterable)
+        occ = next(iterator, None)
+        if occ is not None:
+            heap.append((occ.start, pos, occ, iterator))
+    heapify(heap)
+    while len(heap) > 1:
+        start, pos, occ, iterator = heap[0]
+        yield occ
+        occ = next(iterator, None)
+        if occ is None:
+            heappop(heap)
+        else:
+            heapreplace(heap, (occ.start, pos, occ, iterator))
+    if heap:
+        start, pos, occ, iterator = heap[0]
+        yield occ
+        for occ in iterator:
+            yield occ
+
+
+def _merge_two(left, right):
+    """merge two sorted iterables of Intervals (see _merge)
+    """
+    left = iter(left)
+    right = iter(right)
+    left_occ = next(left, None)
+    right_occ = next(right, None)
+    while left_occ is not None and right_occ is not None:
+        if right_occ.start < left_occ.start:
+            yield right_occ
+            right_occ = next(right, None)
+        else:
+            yield left_occ
+            left_occ = next(left, None)
+    while left_occ is not None:
+        yield left_occ
+        left_occ = next(left, None)
+    while right_occ is not None:
+        yield right_occ
+        right_occ = next(right, None)
+
+
+def _coalesce(occurences):
+    """merge overlapping (or touching) Intervals of a sorted iterable
+
+    Intervals which do not overlap any other one are yielded as is.
+    """
+    current = None
+    for occ in occurences:
+        if current is None:
+            current, end = occ, occ.end
+        elif occ.start <= end:
+            if occ.end > end:
+                end = occ.end
+        else:
+            if end != current.end:
+                current = Interval(current.start, end)
+            yield current
+            current, end = occ, occ.end
+    if current is not None:
+        if end != current.end:
+            current = Interval(current.start, end)
+        yield current
+
+
+def union(*iterables):
+    """union of sorted iterables of Intervals
+
+    All the inputs are merged in a single pass, then the overlapping (or
+    touching) Intervals are merged together: it runs in O(n + m) for two
+    inputs, and in O(n log k) for k inputs of n Intervals in total (instead
+    of O(k n) with successive unions).
+
+    usage example:
+
+      .. code-block:: python
+
+        occurences = list(union(ses1.occurences, ses2.occurences,
+                                ses3.occurences))
+
+    *Args:*
+      :iterables: iterables of Intervals, sorted by start date
+
+    *Returns:*
+      :generator: sorted and disjoint Intervals
+
+    """
+    return _coalesce(_merge(*iterables))
+
+
+def difference(left, right):
+    """difference of two sorted iterables of Intervals: left - right
+
+    The two inputs are walked together, so it runs in O(n + m) (plus the
+    number of overlaps). The Intervals of *left* and *right* are never
+    modified: a left Interval which is not cut is yielded as is, else
+    new Intervals are created for the remaining parts.
+
+    Only the *right* Intervals which can still cut a left Interval are
+    kept in memory, so both inputs can be generators.
+
+    .. note:: the result is sorted if *left* is made of disjoint Intervals
+       (as any result of these operations). If *left* Intervals overlap,
+       the remaining parts of an Interval can start after the ones of the
+       next Interval.
+
+    *Args:*
+      :left: iterable of Intervals, sorted by start date
+      :right: iterable of Intervals, sorted by start date
+
+    *Returns:*
+      :generator: the remaining parts of the left Intervals
+
+    """
+    right = union(right)  # sorted and disjoint right Intervals
+    active = deque()
+    next_right = next(right, None)
+    for occ in left:
+        # forget the right Intervals which end before this one: as the
+        # left Intervals are sorted, they can not cut the following ones
+        while active and active[0].end < occ.start:
+            active.popleft()
+        while next_right is not None and next_right.start <= occ.end:
+            if next_right.end >= occ.start:
+                active.append(next_right)
+            next_right = next(right, None)
+
+        start = occ.start
+        cut = False
+        for other in active:
+            if other.start > occ.end:
+                break
+            if other.start > start:
+                yield Interval(start, other.start)
+            if other.end > start:
+                start = other.end
+            cut = True
+        if not cut:
+            yield occ
+        elif start < occ.end:
+            yield Interval(start, occ.end)
+
+
+def intersection(left, right):
+    """intersection of two sorted iterables of Intervals
+
+    The overlapping Intervals of each input are first merged (see
+    :py:func:`union`), then both inputs are walked together: an Interval
+    can overlap many Intervals of the other input. It runs in O(n + m).
+
+    As for :py:meth:`schedule.Interval.__and__`, two touching Intervals
+    intersect on a (start == end) Interval.
+
+    *Args:*
+      :left: iterable of Intervals, sorted by start date
+      :right: iterable of Intervals, sorted by start date
+
+    *Returns:*
+      :generator: sorted and disjoint Intervals
+
+    """
+    left = union(left)
+    right = union(right)
+    left_occ = next(left, None)
+    right_occ = next(right, None)
+    while left_occ is not None and right_occ is not None:
+        start = max(left_occ.start, right_occ.start)
+        end = min(left_occ.end, right_occ.end)
+        if start <= end:
+            if start == left_occ.start and end == left_occ.end:
+                yield left_occ
+            elif start == right_occ.start and end == right_occ.end:
+                yield right_occ
+            else:
+                yield Interval(start, end)
+        if left_occ.end < right_occ.end:
+            left_occ = next(left, None)
+        else:
+            right_occ = next(right, None)
@@ -46,7 +46,18 @@ __authors__ = [
     # alphabetical order by last name
     'Thomas Chiroux', ]
 
-from .session import CalculatedSession
+import datetime
+
+from dateutil.relativedelta import relativedelta
+
+from .interval import Interval
+from .session import Session, CalculatedSession
+from .intervalarray import bisect_left, bisect_right
+from .operations import union, difference
+
+# widening passes of SRules._window_occurences before the bounds of the
+# period are searched in a single pass on all the occurences
+_MAX_WIDENING = 2
 
 
 def find(_list, _search):
@@ -56,6 +67,28 @@ def find(_list, _search):
                 (None, None))
 
 
+def _start_bounds(occurences, start, end):
+    """returns the positions (first, last) of the Intervals of a sorted
+    list which start between *start* and *end* (included): O(log n)
+    """
+    low, high = 0, len(occurences)
+    while low < high:
+        mid = (low + high) // 2
+        if occurences[mid].start < start:
+            low = mid + 1
+        else:
+            high = mid
+    first = low
+    high = len(occurences)
+    while low < high:
+        mid = (low + high) // 2
+        if occurences[mid].start <= end:
+            low = mid + 1
+        else:
+            high = mid
+    return first, low
+
+
 class SRules(CalculatedSession):
     """SRules : Schedule Rules Class
 
@@ -151,15 +184,25 @@ class SRules(CalculatedSession):
       * if False, you'll have to call _recalculate_occurences manually. It can
         save some CPU when creating complex or big SRules.
 
+    :retention: (timedelta or relativedelta) : if given, the occurences
+                (of the SRules and of its sessions) which ended more than
+                *retention* ago are dropped each time the occurences are
+                recalculated (see :py:meth:`schedule.SRules.evict`)
+
     """
-    def __init__(self, name, auto_refresh=True):
+    def __init__(self, name, auto_refresh=True, retention=None):
         CalculatedSession.__init__(self)
 
         self.name = name
         self.auto_refresh = auto_refresh
+        self.retention = retention
         self.sessions = []
         self.occurences = []
-        self.total_duration = 0
+
+        # checkpoints of the calculation: for each position in the session
+        # list, (session, session version, session type, occurences after
+        # processing the sessions up to this position)
+        self._checkpoints = []
 
     def add_session(self, session):
         """add new session to SRules object
@@ -243,14 +286,406 @@ class SRules(CalculatedSession):
         if self.auto_refresh:
             self._recalculate_occurences()
 
+    def _get_horizon_end(self):
+        """returns the date up to which the occurences are calculated, or
+        None if all the occurences are calculated
+
+        It's the smallest horizon end of the sessions (see the *horizon*
+        of :py:class:`schedule.Session`)
+        """
+        # (called by every lookup: no intermediate list)
+        horizon_end = None
+        for _session in self.sessions:
+            session_end = _session._get_horizon_end()
+            if session_end is not None and \
+                    (horizon_end is None or session_end < horizon_end):
+                horizon_end = session_end
+        return horizon_end
+
+    def _horizon_ends(self):
+        """returns the horizon ends of the sessions which have one
+        """
+        horizon_ends = [_session._get_horizon_end()
+                        for _session in self.sessions]
+        return [horizon_end for horizon_end in horizon_ends
+                if horizon_end is not None]
+
+    def _extend_horizon(self, the_date):
+        """calculate the occurences of the sessions with open-ended rules up
+        to *the_date* (and at least one more horizon window), then the
+        occurences of the SRules
+        """
+        for _session in self.sessions:
+            if _session._get_horizon_end() is not None:
+                _session._extend_horizon(the_date)
+        self._recalculate_occurences()
+
+    def between(self, start, end, inclusive=True):
+        """Return all occurences between two dates
+
+        see :py:meth:`schedule.CalculatedSession.between`
+
+        When the occurences of the period are not calculated (sessions
+        changed since the last calculation, period beyond the horizon of
+        open-ended rules, evicted occurences), only the period is
+        calculated: the rules of each session are expanded within the
+        period, then merged or excluded in the session order. It costs
+        proportionally to the period instead of the whole schedule, and the
+        occurences of the SRules are not recalculated.
+
+        """
+        if self._is_calculated(start, end):
+            return CalculatedSession.between(self, start, end, inclusive)
+        # same selection as CalculatedSession._between_bounds
+        occurences = self._window_occurences(start, end)
+        if inclusive:
+            occurences = [occ for occ in occurences
+                          if occ.end >= start and occ.start <= end]
+        else:
+            occurences = [occ for occ in occurences
+                          if occ.start > start and occ.end < end]
+        return CalculatedSession._from_sorted(occurences)
+
+    def count_between(self, start, end, inclusive=True):
+        """Return the number of occurences between two dates
+
+        see :py:meth:`schedule.Session.count_between` (the occurences of
+        the period are calculated if needed, as in
+        :py:meth:`schedule.SRules.between`)
+
+        """
+        if self._is_calculated(start, end):
+            return CalculatedSession.count_between(self, start, end,
+                                                   inclusive)
+        return len(self.between(start, end, inclusive))
+
+    def _window_occurences(self, start, end):
+        """returns the list of the occurences of the SRules overlapping
+        (or touching) the period between *start* and *end*, calculated
+        from the occurences of the sessions within the period only
+
+        The period is first widened until no occurence of the sessions
+        crosses its bounds: the occurences of the SRules at the bounds are
+        then complete. A pass only widens it up to the occurences crossing
+        the bounds: after _MAX_WIDENING passes (touching occurences), the
+        bounds are searched in a single pass instead (see
+        :py:meth:`schedule.SRules._widened_bounds`).
+        """
+        if self._is_calculated(start, end):
+            low, high = CalculatedSession._between_bounds(self, start, end)
+            return self.occurences[low:high]
+        for _ in range(_MAX_WIDENING):
+            windows = [_session._window_occurences(start, end)
+                       for _session in self.sessions]
+            new_start, new_end = start, end
+            for occurences in windows:
+                for occ in occurences:
+                    if occ.start < new_start:
+                        new_start = occ.start
+                    if occ.end > new_end:
+                        new_end = occ.end
+            if new_start == start and new_end == end:
+                break
+            start, end = new_start, new_end
+        else:
+            start, end = self._widened_bounds(start, end)
+            windows = [_session._window_occurences(start, end)
+                       for _session in self.sessions]
+
+        occurences = []
+        adds = []
+        for pos, _session in enumerate(self.sessions):
+            if _session.session_type == 'add':
+                adds.append(windows[pos])
+                if pos + 1 < len(self.sessions) and \
+                        self.sessions[pos + 1].session_type == 'add':
+                    continue
+                occurences = list(union(occurences, *adds))
+                adds = []
+            elif _session.session_type == 'exclude':
+                occurences = list(difference(occurences, windows[pos]))
+        return occurences
+
+    def _evicted_before(self, the_date):
+        # (generated again from the rules of the sessions, see _iter_window)
+        return Session._evicted_before(self, the_date)
+
+    def _widened_bounds(self, start, end):
+        """returns the bounds of the period between *start* and *end*,
+        widened until no occurence of the sessions crosses them
+
+        The occurences of all the sessions are merged on the fly, from the
+        first one to the end of the period: the merged occurences
+        overlapping (or touching) the period give its bounds, in a single
+        pass whatever the number of touching occurences.
+        """
+        first = self._first_start()
+        if first is None or first > start:
+            first = start
+        occurences = union(*[
+            _session._iter_window(first, datetime.datetime.max)
+            for _session in self.sessions])
+        for occ in occurences:
+            if occ.start > end:
+                break
+            if occ.end < start:
+                continue
+            start, end = min(start, occ.start), max(end, occ.end)
+        return start, end
+
+    def _is_calculated(self, start, end):
+        """returns True if the occurences of the SRules are up to date
+        (no session added, removed, moved or changed since the last
+        calculation) and contain all the occurences between *start* and
+        *end*
+        """
+        if len(self._checkpoints) != len(self.sessions):
+            return False
+        for checkpoint, _session in zip(self._checkpoints, self.sessions):
+            cp_session, cp_version, cp_type, cp_occurences = checkpoint
+            if cp_session is not _session or _session._dirty or \
+                    cp_version != _session._version or \
+                    cp_type != _session.session_type:
+                return False
+        return CalculatedSession._is_calculated(self, start, end)
+
+    def add_working_time(self, start, working_time):
+        """Return the date when a given working time has elapsed since
+        *start*, counting only the time within the occurences
+
+        usage example:
+
+          .. code-block:: python
+
+            # deadline: 4 working hours after the ticket creation
+            deadline = my_srules.add_working_time(
+                ticket_creation, datetime.timedelta(hours=4))
+
+        It uses the cumulative durations of the occurences (see
+        :py:meth:`schedule.Session._get_durations`): O(log n) instead of
+        walking the occurences one by one.
+
+        *Args:*
+          :start: (datetime) : the date and time starting the count
+          :working_time: (timedelta) : the working time to add
+
+        *Returns:*
+          :datetime: the date and time when the working time is elapsed, or
+                     None if the occurences end before (for open-ended
+                     rules: if it is more than 5 years after *start*)
+
+        """
+        if working_time < datetime.timedelta(0):
+            raise ValueError("working_time should be positive")
+        self._ensure_horizon(start)
+        if working_time and self._evicted_before(start):
+            # the evicted occurences are generated again (see _iter_window)
+            # up to the eviction date, the calculated ones are used after
+            for occ in self._iter_window(start, self._evicted_until):
+                if working_time <= occ.end - occ.start:
+                    return occ.start + working_time
+                working_time -= occ.end - occ.start
+            start = self._evicted_until
+        result = self._find_working_time(start, working_time)
+        # not enough occurences calculated yet: extend the horizon (up to
+        # 5 years after the date, as in _next_index)
+        if result is None and self._get_horizon_end() is not None:
+            limit = start + relativedelta(years=+5)
+            while result is None and self._get_horizon_end() < limit:
+                self._extend_horizon(self._get_horizon_end())
+                result = self._find_working_time(start, working_time)
+        return result
+
+    def _find_working_time(self, start, working_time):
+        """returns the date when *working_time* has elapsed since *start*
+        in the calculated occurences, or None
+        (see :py:meth:`schedule.SRules.add_working_time`)
+        """
+        if not working_time:
+            return start
+        occurences = self.occurences
+        starts, max_ends = self._get_index()
+        durations = self._get_durations()
+        # the occurences are disjoint: their ends are sorted
+        pos = bisect_right(max_ends, start)
+        if pos == len(occurences):
+            return None
+        occ = occurences[pos]
+        if occ.start < start:
+            # start is inside this occurence
+            if start + working_time <= occ.end:
+                return start + working_time
+            working_time -= occ.end - start
+            pos += 1
+        target = durations[pos] + working_time.total_seconds()
+        last = bisect_left(durations, target, pos + 1) - 1
+        if last >= len(occurences):
+            return None
+        return occurences[last].start + working_time - \
+            datetime.timedelta(seconds=durations[last] - durations[pos])
+
+    def working_time_between(self, start, end):
+        """Return the working time between two dates: the duration of the
+        occurences between them (see
+        :py:meth:`schedule.Session.duration_between`), in O(log n)
+
+        usage example:
+
+          .. code-block:: python
+
+            elapsed = my_srules.working_time_between(ticket_creation,
+                                                     ticket_closing)
+
+        *Args:*
+          :start: (datetime) : the date and time starting the period
+          :end: (datetime) : the date and time ending the period
+
+        *Returns:*
+          :timedelta: the working time (negative if *end* is before
+                      *start*)
+
+        """
+        if end < start:
+            return -self.working_time_between(end, start)
+        return self._duration_between(start, end)
+
+    def iter_between(self, start, end, inclusive=True):
+        """Iterate over the occurences of the SRules between two dates,
+        calculated on the fly
+
+        The occurences of each session in the period are merged or
+        excluded one by one, in the session order, as in
+        :py:meth:`schedule.SRules._recalculate_occurences`, but nothing is
+        built: the sessions with rules not calculated yet (or open-ended
+        rules, see the *horizon* of :py:class:`schedule.Session`) are
+        expanded on the fly. Exports or reports over very long periods run
+        in constant memory.
+
+        .. note:: unlike :py:meth:`schedule.SRules.between`, the Intervals
+           are cut at *start* and *end*: only their parts within the period
+           are yielded.
+
+        usage example:
+
+          .. code-block:: python
+
+            for interv in my_srules.iter_between(start, end):
+                report(interv)
+
+        *Args:*
+          :start: (datetime) : the date and time starting the period
+          :end: (datetime) : the date and time ending the period
+          :inclusive: (boolean) : if False, the Intervals reduced to
+                                  *start* or *end* (the ones ending at
+                                  *start* or starting at *end*) are not
+                                  yielded
+
+        *Returns:*
+          :generator: the sorted and disjoint Intervals within the period
+
+        """
+        for occ in self._iter_window(start, end):
+            if not inclusive and occ.start == occ.end and \
+                    (occ.start == start or occ.start == end):
+                continue
+            yield occ
+
+    def _iter_window(self, start, end):
+        """Iterate over the occurences of the SRules which overlap (or
+        touch) the period between *start* and *end*, cut at *start* and
+        *end* (see :py:meth:`schedule.SRules.iter_between`)
+        """
+        occurences = iter(())
+        adds = []
+        for pos, _session in enumerate(self.sessions):
+            window = _session._iter_window(start, end)
+            if _session.session_type == 'add':
+                adds.append(window)
+                if pos + 1 < len(self.sessions) and \
+                        self.sessions[pos + 1].session_type == 'add':
+                    continue
+                occurences = union(occurences, *adds)
+                adds = []
+            elif _session.session_type == 'exclude':
+                occurences = difference(occurences, window)
+        for occ in occurences:
+            # (the remainders of an excluded occurence can be outside the
+            # period, when the exclusion crosses *start* or *end*)
+            if occ.end < start:
+                continue
+            if occ.start > end:
+                break
+            if occ.start < start or occ.end > end:
+                occ = Interval(max(occ.start, start), min(occ.end, end))
+            yield occ
+
+    @property
+    def total_duration(self):
+        """the total duration of the occurences, in seconds (including the
+        evicted ones)
+
+        see :py:attr:`schedule.CalculatedSession.total_duration`
+
+        The duration of the evicted occurences is calculated again (see
+        :py:meth:`schedule.SRules._get_evicted_duration`) when the
+        occurences changed since: the sessions added, moved, removed or
+        changed after an eviction count in the past too, as if nothing was
+        evicted.
+        """
+        if self._evicted_duration is None:
+            self._evicted_duration = self._get_evicted_duration()
+        return CalculatedSession.total_duration.fget(self)
+
+    def _first_start(self):
+        """returns the start of the first occurence of the sessions, or
+        None if there is no occurence
+        """
+        first_start = None
+        for _session in self.sessions:
+            session_start = _session._first_start()
+            if session_start is not None and \
+                    (first_start is None or session_start < first_start):
+                first_start = session_start
+        return first_start
+
+    def _get_evicted_duration(self):
+        """returns the duration (in seconds) of the evicted occurences
+
+        The occurences of the sessions are generated again from their rules
+        up to the eviction date, and merged or excluded on the fly (see
+        :py:meth:`schedule.SRules._iter_window`): the past is calculated as
+        if nothing was evicted, in constant memory. The part of the
+        occurences still kept before the eviction date is subtracted (it is
+        counted by the occurences).
+        """
+        evicted_until = self._evicted_until
+        first_start = self._first_start()
+        if evicted_until is None or first_start is None or \
+                first_start >= evicted_until:
+            evicted_duration = 0
+        else:
+            evicted_duration = sum(
+                occ.duration()
+                for occ in self._iter_window(first_start, evicted_until))
+        for occ in self.occurences:
+            if occ.start >= evicted_until:
+                break
+            evicted_duration -= \
+                Interval(occ.start, min(occ.end, evicted_until)).duration()
+        return evicted_duration
+
     def _calc_total_duration(self):
         """returns the total duration of the complete Srule
 
+        Same as the *total_duration* property (see
+        :py:attr:`schedule.CalculatedSession.total_duration`): O(1) once
+        the cumulative durations are built.
+
         usage example:
 
           .. code-block:: python
 
-            print my_srules.total_duration()
+            print my_srules.total_duration
 
         *Args:*
           <none>
@@ -258,11 +693,120 @@ class SRules(CalculatedSession):
         *Returns*
           :int: total duration of the sRules in seconds
         """
-        total = 0
-        for occ in self.occurences:
-            total += occ.duration()
-        self.total_duration = total
-        return total
+        return self.total_duration
+
+    def evict(self, before=None):
+        """drop the occurences which ended before a date, in the SRules and
+        in all its sessions
+
+        see :py:meth:`schedule.Session.evict`
+
+        The sessions which are only a list of Intervals (a
+        :py:class:`schedule.CalculatedSession`) keep all their occurences:
+        they could not be calculated again.
+
+        .. note:: the total duration still includes the dropped occurences
+           (see :py:attr:`schedule.SRules.total_duration`): the sessions
+           added or changed later are taken into account in the past too.
+
+        """
+        if before is None:
+            if self.retention is None:
+                return 0
+            before = datetime.datetime.now() - self.retention
+        for _session in self.sessions:
+            if type(_session) is not CalculatedSession:
+                _session.evict(before)
+        self._evicted_duration = 0
+        nb_evicted = CalculatedSession.evict(self, before)
+        # (calculated again when needed, see total_duration)
+        self._evicted_duration = None
+        return nb_evicted
+
+    def _clean_window(self, sessions, start, end):
+        """widen the time range [*start*, *end*] until no occurence of the
+        sessions crosses (or touches) its bounds
+
+        The occurences of the sessions (and so the results of the
+        operations on them) are then split in three independent parts:
+        before, inside and after the range.
+        """
+        indexes = [_session._get_index() for _session in sessions]
+        moved = True
+        while moved:
+            moved = False
+            for starts, max_ends in indexes:
+                # first occurence which ends after start, does it begin
+                # before ?
+                pos = bisect_left(max_ends, start)
+                if pos < len(starts) and starts[pos] < start:
+                    start = starts[pos]
+                    moved = True
+                # occurences which begin before end, does one end after ?
+                pos = bisect_right(starts, end)
+                if pos and max_ends[pos - 1] > end:
+                    end = max_ends[pos - 1]
+                    moved = True
+        return start, end
+
+    def _splice_checkpoints(self, first, last, start, end):
+        """recalculate the checkpoints from position *first* to *last*
+        (excluded) only in the time range [*start*, *end*], which contains
+        all the changes of the sessions, and splice the results in the
+        previous ones
+        """
+        start, end = self._clean_window(self.sessions[:last], start, end)
+        if first:
+            previous = self._checkpoints[first - 1][3]
+            pos, pos_end = _start_bounds(previous, start, end)
+            window = previous[pos:pos_end]
+        else:
+            window = []
+        adds = []
+        for pos in range(first, last):
+            _session = self.sessions[pos]
+            starts = _session._get_index()[0]
+            occurences = _session.occurences[bisect_left(starts, start):
+                                             bisect_right(starts, end)]
+            old_occurences = self._checkpoints[pos][3]
+            if _session.session_type == 'add':
+                adds.append(occurences)
+                if old_occurences is None:
+                    # (inside a group of add sessions)
+                    self._checkpoints[pos] = (_session, _session._version,
+                                              _session.session_type, None)
+                    continue
+                window = list(union(window, *adds))
+                adds = []
+            elif _session.session_type == 'exclude':
+                window = list(difference(window, occurences))
+            pos_start, pos_end = _start_bounds(old_occurences, start, end)
+            self._checkpoints[pos] = (
+                _session, _session._version, _session.session_type,
+                old_occurences[:pos_start] + window +
+                old_occurences[pos_end:])
+        return start, end
+
+    @staticmethod
+    def _splice_index(index, occurences, window):
+        """returns the search index of the occurences (see
+        :py:meth:`schedule.Session._get_index`) from the previous index,
+        when the occurences only changed in the (clean) window
+        """
+        starts, max_ends = index
+        first = bisect_left(starts, window[0])
+        last = bisect_right(starts, window[1])
+        new_last = len(occurences) - (len(starts) - last)
+        new_starts = []
+        new_max_ends = []
+        max_end = max_ends[first - 1] if first else None
+        for occ in occurences[first:new_last]:
+            new_starts.append(occ.start)
+            if max_end is None or occ.end > max_end:
+                max_end = occ.end
+            new_max_ends.append(max_end)
+        return (starts[:first] + new_starts + starts[last:],
+                max_ends[:first] + new_max_ends + max_ends[last:])
 
     def _recalculate_occurences(self):
         """Recalculate all the occurences (static list) in the object
@@ -276,18 +820,124 @@ class SRules(CalculatedSession):
         it can be called manually, especially when the object is created with
         auto_refresh set to False.
 
+        The intermediate result after each session is kept: the calculation
+        restarts from the first session which was added, removed, moved or
+        changed since the last calculation. The consecutive 'add' sessions
+        are merged in a single union. Editing the last sessions of
+        the list is therefore cheap.
+
+        When the sessions only changed in a known time range (rules added
+        to a session, a horizon extended), the intermediate results are
+        only recalculated in this time range, and spliced into the
+        previous ones.
+
+        When sessions have open-ended rules (see the *horizon* of
+        :py:class:`schedule.Session`), the occurences are calculated up to
+        the same horizon end for all sessions, and extended when a query
+        goes beyond.
+
         """
         # after adding a rule, we need to recompute the period list
 
-        new_calc_session = CalculatedSession([])
-        new_total_duration = 0
-        for _session in self.sessions:
-            #new_occurences2 = CalculatedSession(new_occurences)
+        # sessions with open-ended rules are all calculated up to the same
+        # date, so the result is consistent up to this date
+        horizon_ends = self._horizon_ends()
+        if horizon_ends:
+            for _session in self.sessions:
+                _session._ensure_horizon(max(horizon_ends))
+
+        # restart from the last checkpoint still valid: the sessions before
+        # it are the same, and did not change since (or only in a known
+        # time range: the checkpoints are then spliced)
+        start = 0
+        first_changed = None
+        changed_start = changed_end = None
+        for pos, _session in enumerate(self.sessions):
+            _session.occurences  # (calculated if needed)
+            if pos >= len(self._checkpoints):
+                break
+            cp_session, cp_version, cp_type, cp_occurences = \
+                self._checkpoints[pos]
+            if cp_session is not _session or \
+                    cp_type != _session.session_type:
+                break
+            if cp_version != _session._version:
+                changed = _session._changes_since(cp_version)
+                if changed is None:
+                    break
+                if first_changed is None:
+                    first_changed = pos
+                if changed_start is None or changed[0] < changed_start:
+                    changed_start = changed[0]
+                if changed_end is None or changed[1] > changed_end:
+                    changed_end = changed[1]
+            start = pos + 1
+        # consecutive add sessions are processed at once (see below): only
+        # the last one of a group has a checkpoint
+        while start and self._checkpoints[start - 1][3] is None:
+            start -= 1
+        del self._checkpoints[start:]
+        if first_changed is not None and first_changed >= start:
+            first_changed = None
+        while first_changed and \
+                self._checkpoints[first_changed - 1][3] is None:
+            first_changed -= 1
+        window = None
+        if first_changed is not None:
+            window = self._splice_checkpoints(first_changed, start,
+                                              changed_start, changed_end)
+
+        if start:
+            new_occurences = self._checkpoints[start - 1][3]
+        else:
+            new_occurences = []
+        # the consecutive add sessions are merged in a single union
+        adds = []
+        for pos in range(start, len(self.sessions)):
+            _session = self.sessions[pos]
             if _session.session_type == 'add':
-                new_calc_session = new_calc_session + _session
+                adds.append(_session.occurences)
+                if pos + 1 < len(self.sessions) and \
+                        self.sessions[pos + 1].session_type == 'add':
+                    self._checkpoints.append((_session, _session._version,
+                                              _session.session_type, None))
+                    continue
+                new_occurences = list(union(new_occurences, *adds))
+                adds = []
             elif _session.session_type == 'exclude':
-                new_calc_session = new_calc_session - _session
-            #new_occurences = list(new_occurences2)
+                new_occurences = list(difference(new_occurences,
+                                                 _session.occurences))
+            self._checkpoints.append((_session, _session._version,
+                                      _session.session_type, new_occurences))
 
-        self.occurences = list(new_calc_session)  # new_occurences
-        self.total_duration = new_total_duration  # not used
+        # the result is only complete after the last eviction date of the
+        # sessions (see their retention): it is evicted up to it too
+        for _session in self.sessions:
+            if _session._evicted_until is not None and \
+                    (self._evicted_until is None or
+                     _session._evicted_until > self._evicted_until):
+                self._evicted_until = _session._evicted_until
+        spliced = window is not None and start == len(self.sessions) and \
+            self._evicted_until is None
+        if self._evicted_until is not None:
+            # the sessions do not have the evicted occurences anymore
+            # (except the last one), neither should the result
+            pos = 0
+            while pos < len(new_occurences) - 1 and \
+                    new_occurences[pos + 1].end < self._evicted_until:
+                pos += 1
+            new_occurences = new_occurences[pos:]
+
+        old_index = self._index
+        self.occurences = new_occurences
+        if self._evicted_until is not None:
+            # (calculated again when needed, see total_duration)
+            self._evicted_duration = None
+        if spliced:
+            # only the window changed, the search index can be spliced too
+            self._record_change(*window)
+            if old_index is not None:
+                self._index = self._splice_index(old_index, new_occurences,
+                                                 window)
+        if self.retention is not None:
+            self.evict()
@@ -25,7 +25,6 @@ Contains:
 """
 from __future__ import absolute_import
 from builtins import str
-from builtins import range
 from builtins import object
 
 __authors__ = [
@@ -36,7 +35,59 @@ from dateutil.relativedelta import relativedelta
 from dateutil import rrule
 import datetime
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from .interval import Interval
+from .intervalarray import IntervalArray, bisect_left, bisect_right
+from .expander import expand_rules
+from .operations import union, difference, intersection
+
+# number of known changes kept by a session (see Session._changes_since)
+_MAX_CHANGES = 16
+
+
+def _diff_range(old, new):
+    """returns the (start, end) time range which contains all the
+    Intervals which differ between two sorted Interval lists, or None if
+    the lists are equal
+
+    The lists are compared from both ends: O(n) at worst, but it stops at
+    the first difference.
+    """
+    size = min(len(old), len(new))
+    first = 0
+    while first < size and old[first] == new[first]:
+        first += 1
+    if first == len(old) == len(new):
+        return None
+    last = 0
+    while last < size - first and old[-1 - last] == new[-1 - last]:
+        last += 1
+    changed = old[first:len(old) - last] + new[first:len(new) - last]
+    return (min(occ.start for occ in changed),
+            max(occ.end for occ in changed))
+
+
+def _occurences_of(other):
+    """returns the sorted Interval list of an operand of the Session
+    operators, or None if the operand type is not supported
+
+    *Args:*
+      :other: can be:
+         * Session (or CalculatedSession, SRules)
+         * Interval
+         * datetime
+    """
+    if isinstance(other, Session):
+        return other.occurences
+    elif type(other) == Interval:
+        return [other]
+    elif type(other) == datetime.datetime:
+        return [Interval(other, other)]
+    return None
 
 
 class Session(object):
@@ -140,12 +191,24 @@ class Session(object):
                        and the 'exclude' will remove his values to other
                        sessions
         :session_description: (string) : free text to describe your session
+        :horizon: (timedelta or relativedelta) : if given, the rules without
+                  *count* nor *until* are not capped (at now + 5 years)
+                  anymore: the occurences are only calculated up to
+                  now + *horizon*, and extended (by at least *horizon*)
+                  when a query goes beyond. If None (default), all the
+                  occurences are calculated.
+        :retention: (timedelta or relativedelta) : if given, the occurences
+                    which ended more than *retention* ago are dropped each
+                    time the occurences are calculated (see
+                    :py:meth:`schedule.Session.evict`). If None (default),
+                    all the occurences are kept.
 
     """
 
     def __init__(self, session_name="",
                  duration=60, start_hour=0, start_minute=0,
-                 session_type='add', session_description=None):
+                 session_type='add', session_description=None,
+                 horizon=None, retention=None):
         """Constructor for Session object
 
         At creation the object is set with initial parameters, but no rule, so
@@ -175,13 +238,333 @@ class Session(object):
         self.start_minute = int(start_minute)
         self.set = rrule.rruleset()
 
-        # calculated occurence list:
+        # calculated occurence list (_version changes each time it changes,
+        # and _changes keeps the time range of the last changes)
+        self._version = 0
+        self._changes = []
         self.occurences = []
-        self.total_duration = 0
+        self._total_duration = 0
+        # True when rules were added since the last calculation of the
+        # occurences: they will be calculated at first access
+        self._dirty = False
+
+        # with open-ended rules (and a horizon), the occurences are only
+        # calculated up to _horizon_end (None: all the occurences are)
+        self.horizon = horizon
+        self._horizon_end = None
+
+        # the occurences which ended before _evicted_until are dropped
+        # (see evict), _evicted_duration is their duration (in seconds)
+        self.retention = retention
+        self._evicted_until = None
+        self._evicted_duration = 0
 
         # "backup" of rules, in order to be able to reprocess them
         self.rules = []
 
+    @property
+    def occurences(self):
+        """the calculated occurence list (sorted list of Intervals)
+
+        The occurences are (re)calculated at first access after a rule was
+        added (see :py:meth:`schedule.Session.add_rules`)
+        """
+        if self._dirty:
+            self._recalculate_occurences()
+        return self._occurences
+
+    @occurences.setter
+    def occurences(self, occurences):
+        self._occurences = occurences
+        self._index = None
+        self._array_index = None
+        self._durations = None
+        self._version += 1
+        # the changed range is unknown, unless recorded (see _record_change)
+        self._changes.append((self._version, None))
+        del self._changes[:-_MAX_CHANGES]
+
+    def _record_change(self, start, end):
+        """record that the last change of the occurences only concerns the
+        occurences between *start* and *end*
+        """
+        self._changes[-1] = (self._version, (start, end))
+
+    def _changes_since(self, version):
+        """returns the (start, end) time range which contains all the
+        occurences changed since the given version, or None if it is not
+        known
+        """
+        nb_changes = self._version - version
+        if nb_changes <= 0 or nb_changes > len(self._changes):
+            return None
+        start = end = None
+        for _version, changed in self._changes[-nb_changes:]:
+            if changed is None:
+                return None
+            if start is None or changed[0] < start:
+                start = changed[0]
+            if end is None or changed[1] > end:
+                end = changed[1]
+        return start, end
+
+    @property
+    def total_duration(self):
+        """the total duration of the occurences, in minutes (the *duration*
+        of the session times the number of occurences)
+
+        .. note:: :py:attr:`schedule.CalculatedSession.total_duration` (and
+           so the one of :py:class:`schedule.SRules`) is in seconds.
+        """
+        if self._dirty:
+            self._recalculate_occurences()
+        return self._total_duration
+
+    @total_duration.setter
+    def total_duration(self, total_duration):
+        self._total_duration = total_duration
+
+    def _get_index(self):
+        """returns the search index of the occurences, (re)built if needed
+
+        The index is a tuple of two lists, with one element per occurence:
+
+        * the start dates of the occurences (they are sorted)
+        * the max end date of the occurences up to this one (as occurences
+          can overlap, their end dates are not always sorted)
+
+        It is used to find occurences with a binary search (see
+        :py:meth:`schedule.Session.__contains__`)
+
+        When the occurences are an :py:class:`intervalarray.IntervalArray`,
+        the index reads its date arrays (see *IntervalArray._get_index*).
+        """
+        if self._dirty or self._index is None:
+            if isinstance(self.occurences, IntervalArray):
+                self._index = self.occurences._get_index()
+                return self._index
+            starts = []
+            max_ends = []
+            max_end = None
+            for occ in self.occurences:
+                starts.append(occ.start)
+                if max_end is None or occ.end > max_end:
+                    max_end = occ.end
+                max_ends.append(max_end)
+            self._index = (starts, max_ends)
+        return self._index
+
+    def _get_durations(self):
+        """returns the cumulative durations of the occurences, (re)built if
+        needed
+
+        The list has one more element than the occurences: the element at
+        position i is the total duration (in seconds) of the occurences
+        before position i, so the duration of any slice of the occurences
+        is a subtraction (see :py:meth:`schedule.Session.duration_between`)
+        """
+        if self._dirty or self._durations is None:
+            if isinstance(self.occurences, IntervalArray):
+                self._durations = self.occurences._get_durations()
+                return self._durations
+            durations = [0]
+            total = 0
+            for occ in self.occurences:
+                total += occ.duration()
+                durations.append(total)
+            self._durations = durations
+        return self._durations
+
+    def _get_horizon_end(self):
+        """returns the date up to which the occurences are calculated, or
+        None if all the occurences are calculated
+        """
+        return self._horizon_end
+
+    def _ensure_horizon(self, the_date):
+        """make sure the occurences are calculated up to *the_date*
+        (only for sessions with open-ended rules, see *horizon*)
+        """
+        horizon_end = self._get_horizon_end()
+        if horizon_end is not None and the_date > horizon_end:
+            self._extend_horizon(the_date)
+
+    def _extend_horizon(self, the_date):
+        """calculate the occurences up to *the_date*, and at least one more
+        *horizon* window
+        """
+        occurences = self.occurences
+        old_end = self._horizon_end
+        new_end = max(the_date, old_end + self.horizon)
+        new_occurences = [
+            Interval(occ, occ + relativedelta(minutes=+self.duration))
+            for occ in self.set.between(old_end, new_end, True)
+            if occ > old_end]
+        self._horizon_end = new_end
+        if new_occurences:
+            self.occurences = occurences + new_occurences
+            self._record_change(new_occurences[0].start,
+                                max(occ.end for occ in new_occurences))
+            self.total_duration += len(new_occurences) * self.duration
+        if self.retention is not None:
+            self.evict()
+
+    def evict(self, before=None):
+        """drop the occurences which ended before a date
+
+        Used by long-running processes to keep the memory flat: the
+        occurences of the past are not kept forever.
+
+        The last occurence ending before the date is kept, so
+        :py:meth:`schedule.Session.next_interval`,
+        :py:meth:`schedule.Session.prev_interval` and the other lookups
+        stay correct for any date after *before*. The total duration still
+        includes the dropped occurences.
+
+        Before *before*, the periods (*between*, *duration_between*, *in*,
+        ...) are generated again from the rules, and the lookups by
+        position (*index_of*, *nth_after*, and the *next_interval* and
+        *prev_interval* of the calculated sessions) raise ValueError. A
+        :py:class:`schedule.CalculatedSession` has no rules: these periods
+        raise ValueError too.
+
+        usage example:
+
+          .. code-block:: python
+
+            my_session.evict(datetime.datetime.now() - relativedelta(days=30))
+
+        *Args:*
+          :before: (datetime) : by default, now - *retention*
+                   (nothing is dropped if the session has no retention)
+
+        *Returns:*
+          :int: the number of dropped occurences
+
+        """
+        if before is None:
+            if self.retention is None:
+                return 0
+            before = datetime.datetime.now() - self.retention
+        if self._evicted_until is None or before > self._evicted_until:
+            self._evicted_until = before
+
+        occurences = self.occurences
+        starts, max_ends = self._get_index()
+        # all the occurences before pos ended before the date, keep the last
+        pos = bisect_left(max_ends, before) - 1
+        if pos <= 0:
+            return 0
+        for occ in occurences[:pos]:
+            self._evicted_duration += occ.duration()
+        self.occurences = occurences[pos:]
+        return pos
+
+    def _evicted_before(self, the_date):
+        """returns True if occurences ending after *the_date* were evicted
+        (see :py:meth:`schedule.Session.evict`): they are then generated
+        again from the rules (see :py:meth:`schedule.Session._iter_window`)
+        """
+        return self._evicted_until is not None and \
+            the_date < self._evicted_until
+
+    def _check_not_evicted(self, the_date):
+        """raise ValueError if occurences ending after *the_date* were
+        evicted: the positions of the occurences, and so their neighbours,
+        are only known after the eviction date
+        """
+        if Session._evicted_before(self, the_date):
+            raise ValueError("the occurences before %s are evicted" %
+                             self._evicted_until)
+
+    def _next_index(self, the_date=None, inclusive=True):
+        """returns the position of the next occurence for a given date
+        (see :py:meth:`schedule.CalculatedSession.next_interval`), or None
+
+        It uses a binary search on the occurence index: O(log n)
+        """
+        if the_date is None:
+            the_date = datetime.datetime.now()
+
+        self._check_not_evicted(the_date)
+        self._ensure_horizon(the_date)
+        pos = self._find_next_index(the_date, inclusive)
+        # the next occurence can be after the horizon: extend it (up to
+        # 5 years after the date, as for the rules without horizon)
+        if pos is None and self._get_horizon_end() is not None:
+            limit = the_date + relativedelta(years=+5)
+            while pos is None and self._get_horizon_end() < limit:
+                self._extend_horizon(self._get_horizon_end())
+                pos = self._find_next_index(the_date, inclusive)
+        return pos
+
+    def _find_next_index(self, the_date, inclusive):
+        """see :py:meth:`schedule.Session._next_index`
+        """
+        # some shotcuts (occurences are sorted):
+        if not self.occurences:
+            return None
+        if self.occurences[0].start > the_date:
+            return None
+        if self.occurences[-1].end < the_date:
+            return None
+
+        starts, max_ends = self._get_index()
+        # first occurence ending after the date
+        pos = bisect_left(max_ends, the_date)
+        if pos == len(starts):
+            return None
+        if starts[pos] > the_date or inclusive:
+            return pos
+        # the date is inside this occurence: returns the next one
+        if pos + 1 < len(starts):
+            return pos + 1
+        return None
+
+    def _prev_index(self, the_date=None, inclusive=True):
+        """returns the position of the previous occurence for a given date
+        (see :py:meth:`schedule.CalculatedSession.prev_interval`), or None
+
+        It uses a binary search on the occurence index: O(log n)
+        """
+        if the_date is None:
+            the_date = datetime.datetime.now()
+
+        self._check_not_evicted(the_date)
+        self._ensure_horizon(the_date)
+        # no occurence is returned after the last one, but the next
+        # occurence can be after the horizon: extend it (up to 5 years after
+        # the date, as in _next_index)
+        if self._get_horizon_end() is not None:
+            limit = the_date + relativedelta(years=+5)
+            while self.occurences and \
+                    self._get_index()[1][-1] < the_date and \
+                    self._get_horizon_end() < limit:
+                self._extend_horizon(self._get_horizon_end())
+        # some shotcuts (occurences are sorted):
+        if not self.occurences:
+            return None
+        if self.occurences[0].start > the_date:
+            return None
+        if self.occurences[-1].end < the_date:
+            return None
+
+        starts, max_ends = self._get_index()
+        # first occurence starting after the date
+        after = bisect_right(starts, the_date)
+        # first occurence ending after the date
+        pos = bisect_left(max_ends, the_date)
+        if pos < after:
+            # the date is inside this occurence
+            if inclusive:
+                return pos
+            if pos > 0:
+                return pos - 1
+            return None
+        if after < len(starts):
+            return after - 1
+        return None
+
     def __unicode__(self):
         """Returns unicode string describting the objects and his content
 
@@ -195,6 +578,8 @@ class Session(object):
         """
         return u"%s" % self.session_name
 
+    __str__ = __unicode__
+
     def __repr__(self):
         """Representation of object
 
@@ -205,7 +590,7 @@ class Session(object):
           :string: string representation of an :py:class:`schedule.Interval`
 
         """
-        return str(self).encode('utf-8')
+        return str(self)
 
     def __iter__(self):
         """iterable
@@ -319,6 +704,9 @@ class Session(object):
 
         see also :py:class:`schedule.Session.in_interval`
 
+        The occurences are searched with a binary search on their index
+        (see :py:meth:`schedule.Session._get_index`): O(log n).
+
         *Args:*
           :other: can be:
              * Interval
@@ -336,19 +724,30 @@ class Session(object):
 
         """
         if type(other) == Interval:
-            for occ in self.occurences:
-                if occ.start <= other.start <= other.end <= occ.end:
-                    if return_interval:
-                        return occ
-                    else:
-                        return True
+            start, end = other.start, other.end
         elif type(other) == datetime.datetime:
-            for occ in self.occurences:
-                if occ.start <= other <= occ.end:
+            start = end = other
+        else:
+            start = end = None
+
+        if start is not None and self._evicted_before(start):
+            # (generated again, complete, see _window_occurences)
+            for occ in self._window_occurences(start, end):
+                if occ.start <= start and occ.end >= end:
                     if return_interval:
                         return occ
-                    else:
-                        return True
+                    return True
+        elif start is not None:
+            self._ensure_horizon(end)
+            # the first occurence ending after *end* is the only candidate:
+            # it contains other if it starts before *start*
+            starts, max_ends = self._get_index()
+            pos = bisect_left(max_ends, end)
+            if pos < bisect_right(starts, start):
+                if return_interval:
+                    return self.occurences[pos]
+                else:
+                    return True
 
         if return_interval:
             return None
@@ -397,6 +796,145 @@ class Session(object):
         """
         return self.__contains__(other, return_interval)
 
+    def iter_in_interval(self, queries):
+        """batch version of :py:meth:`schedule.Session.in_interval`: for
+        each query (datetime or Interval), yields the query and the
+        matching occurence (or None)
+
+        The queries are walked together with the occurences, in a single
+        pass: O(n + m) when they are sorted (by date, or by end date for
+        Intervals), without numpy (see
+        :py:meth:`schedule.Session.contains_many`). The queries which are
+        not in order are still answered, by a binary search.
+
+        usage example:
+
+          .. code-block:: python
+
+            for log_date, interv in my_srules.iter_in_interval(log_dates):
+                if interv is None:
+                    alert(log_date)
+
+        *Args:*
+          :queries: iterable of datetimes or Intervals
+
+        *Returns:*
+          :generator: of tuples (query, Interval or None)
+
+        """
+        version = horizon_end = None
+        # the walk: all the occurences before pos end before walk_end
+        pos = 0
+        walk_end = None
+        for query in queries:
+            if type(query) == Interval:
+                start, end = query.start, query.end
+            elif type(query) == datetime.datetime:
+                start = end = query
+            else:
+                yield query, None
+                continue
+
+            if version is None or \
+                    (horizon_end is not None and end > horizon_end):
+                self._ensure_horizon(end)
+                horizon_end = self._get_horizon_end()
+            if version != self._version:
+                # (first query, or occurences extended or evicted since)
+                occurences = self.occurences
+                starts, max_ends = self._get_index()
+                version = self._version
+                pos = 0 if walk_end is None else \
+                    bisect_left(max_ends, walk_end)
+
+            # (as in __contains__) the first occurence ending after the
+            # query, does it start before ?
+            if walk_end is None or end >= walk_end:
+                while pos < len(max_ends) and max_ends[pos] < end:
+                    pos += 1
+                walk_end = end
+                candidate = pos
+            else:
+                candidate = bisect_left(max_ends, end)
+            if candidate < len(starts) and starts[candidate] <= start:
+                yield query, occurences[candidate]
+            else:
+                yield query, None
+
+    def contains_many(self, timestamps, return_index=False):
+        """vectorized membership test: for each timestamp, True if it is
+        in the session (as *timestamp in self*, see
+        :py:meth:`schedule.Session.__contains__`)
+
+        With *numpy*, the timestamps are searched all at once in the
+        occurence index (see :py:meth:`schedule.Session._get_index`), with
+        *searchsorted*. Without it, they are searched one by one (binary
+        search).
+
+        usage example:
+
+          .. code-block:: python
+
+            mask = my_srules.contains_many(telemetry['timestamp'])
+            outside = telemetry[~mask]
+
+        *Args:*
+          :timestamps: numpy datetime64 array, or any iterable of datetime
+          :return_index: (boolean) : if True, returns also the position
+                         (in the occurences) of the matching occurence of
+                         each timestamp (-1 if none)
+
+        *Returns:*
+          :mask: numpy array of booleans (a list without numpy)
+          :(mask, index): if *return_index* is True
+
+        """
+        if numpy is None:
+            return self._contains_many_bisect(timestamps, return_index)
+
+        if not isinstance(timestamps, numpy.ndarray):
+            timestamps = list(timestamps)
+        dates = numpy.asarray(timestamps, dtype='datetime64[us]')
+        if dates.size:
+            self._ensure_horizon(dates.max().astype(object))
+        if isinstance(self.occurences, IntervalArray):
+            self._array_index = (self.occurences.starts,
+                                 self.occurences._get_max_ends())
+        elif self._dirty or self._array_index is None:
+            starts, max_ends = self._get_index()
+            self._array_index = (
+                numpy.array(starts, dtype='datetime64[us]'),
+                numpy.array(max_ends, dtype='datetime64[us]'))
+        starts, max_ends = self._array_index
+        # (as in __contains__) the first occurence ending after the date,
+        # does it start before ?
+        pos = numpy.searchsorted(max_ends, dates, 'left')
+        mask = pos < numpy.searchsorted(starts, dates, 'right')
+        if return_index:
+            return mask, numpy.where(mask, pos, -1)
+        return mask
+
+    def _contains_many_bisect(self, timestamps, return_index):
+        """see :py:meth:`schedule.Session.contains_many` (without numpy)
+        """
+        timestamps = list(timestamps)
+        if timestamps:
+            self._ensure_horizon(max(timestamps))
+        starts, max_ends = self._get_index()
+        mask = []
+        index = []
+        for the_date in timestamps:
+            pos = bisect_left(max_ends, the_date)
+            if pos < bisect_right(starts, the_date):
+                mask.append(True)
+                index.append(pos)
+            else:
+                mask.append(False)
+                index.append(-1)
+        if return_index:
+            return mask, index
+        return mask
+
     def __and__(self, other):
         """'&' operator
 
@@ -442,30 +980,22 @@ class Session(object):
 
 
         """
-        result = []
         if other is None:
             return CalculatedSession([])
-        if not len(other):
+        others = _occurences_of(other)
+        if others is None:
+            raise TypeError("Can not calculate Session and %s" % type(other))
+        if not len(others):
             return CalculatedSession([])
         if not len(self):
             return CalculatedSession([])
 
-        if type(other) == Interval:
-            all_occs = sorted(self.occurences + [other])
-        elif type(other) == datetime.datetime:
-            all_occs = sorted(self.occurences + [Interval(other, other)])
-        elif type(other) == Session or type(other) == CalculatedSession:
-            all_occs = sorted(self.occurences + other.occurences)
-        else:
-            raise TypeError("Can not calculate Session and %s" % type(other))
-
-        total_len = len(all_occs)
-        for i in range(0, total_len-2):
-            _and = all_occs[i] & all_occs[i+1]
-            if _and is not None:
-                result.append(_and)
-
-        return CalculatedSession(result)
+        if isinstance(self.occurences, IntervalArray):
+            # (vectorized, and kept as an IntervalArray)
+            return CalculatedSession(
+                self.occurences & IntervalArray._of(others))
+        return CalculatedSession._from_sorted(
+            list(intersection(self.occurences, others)))
 
     def __add__(self, other):
         """'+' operator
@@ -516,47 +1046,20 @@ class Session(object):
         """
         if other is None:
             return CalculatedSession(self.occurences)
-        if not len(other):
+        others = _occurences_of(other)
+        if others is None:
+            raise TypeError("Can not add Session with %s" % type(other))
+        if not len(others):
             return CalculatedSession(self.occurences)
         if not len(self):
-            return CalculatedSession(other.occurences)
+            return CalculatedSession(others)
 
-        if type(other) == Interval:
-            all_occs = sorted(self.occurences + [other])
-        elif type(other) == datetime.datetime:
-            all_occs = sorted(self.occurences + [Interval(other, other)])
-        elif type(other) == Session or type(other) == CalculatedSession:
-            all_occs = sorted(self.occurences + other.occurences)
-        else:
-            raise TypeError("Can not add Session with %s" % type(other))
-
-        result = []
-        recover = True
-        while recover:  # continues until only disjoint Intervals are present
-            total_len = len(all_occs)
-            prec_occ = []
-            result = []
-            recover = False
-            for i in range(total_len-1):
-                try:
-                    #print "i:%s, %s, %s" % (i, all_occs[i], all_occs[i+1])
-                    _and = all_occs[i] & all_occs[i+1]
-                except IndexError:
-                    # index out of range (because of i+1): we are at the end
-                    #print "i:%s, %s, --" % (i, all_occs[i])
-                    _and = None
-                if _and is not None:
-                    prec_occ = all_occs[i] + all_occs[i+1]
-                    result.append(prec_occ)
-                    recover = True
-                else:
-                    if all_occs[i] not in prec_occ:
-                        result.append(all_occs[i])
-                    if i == total_len-2:
-                        result.append(all_occs[i+1])
-            all_occs = sorted(result)
-
-        return CalculatedSession(result)
+        if isinstance(self.occurences, IntervalArray):
+            # (vectorized, and kept as an IntervalArray)
+            return CalculatedSession(
+                self.occurences + IntervalArray._of(others))
+        return CalculatedSession._from_sorted(
+            list(union(self.occurences, others)))
 
     def __sub__(self, other):
         """'-' operator
@@ -607,80 +1110,42 @@ class Session(object):
         """
         if other is None:
             return CalculatedSession(self.occurences)
-        if not len(other):
+        others = _occurences_of(other)
+        if others is None:
+            raise TypeError("Can not substract Session with %s" % type(other))
+        if not len(others):
             return CalculatedSession(self.occurences)
         if not len(self):
             return CalculatedSession([])
 
-        for occ in self.occurences:
-            occ.rank = 2
+        if isinstance(self.occurences, IntervalArray):
+            # (vectorized, and kept as an IntervalArray: sorted again, as
+            # the occurences can overlap)
+            result = self.occurences - IntervalArray._of(others)
+            return CalculatedSession(IntervalArray(result.starts,
+                                                   result.ends))
+        # the result is already sorted when self has no overlapping
+        # Intervals, and sorting it again is then linear
+        return CalculatedSession(list(difference(self.occurences, others)))
+
+    def lazy(self):
+        """returns a lazy expression on the session: the +, - and &
+        operators on it do not calculate anything until the result is
+        needed (see :py:mod:`expression`)
 
-        if type(other) == Interval:
-            other.rank = 1
-            all_occs = sorted(self.occurences + [other])
-        elif type(other) == datetime.datetime:
-            interv = Interval(other, other)
-            interv.rank = 1
-            all_occs = sorted(self.occurences + [interv])
-        elif type(other) == Session or type(other) == CalculatedSession:
-            for occ in other.occurences:
-                occ.rank = 1
-            all_occs = sorted(self.occurences + other.occurences)
-        else:
-            raise TypeError("Can not substract Session with %s" % type(other))
+        usage example:
 
-        result = []
-        recover = True
-        while recover:  # continues until only disjoint Intervals are present
-            #print "----- new loop ------"
-            #print all_occs
-            #print "---------------------"
-            total_len = len(all_occs)
-            prec_occ = []
-            result = []
-            recover = False
-            for i in range(0, total_len-1):
-                _and = all_occs[i] & all_occs[i+1]
-                if _and is not None:
-                    substraction_result = None
-                    if all_occs[i].rank == 2 and all_occs[i+1].rank == 1:
-                        substraction_result = all_occs[i] - all_occs[i+1]
-                        prec_occ = all_occs[i]
-                    elif all_occs[i].rank == 1 and all_occs[i+1].rank == 2:
-                        # the interval to be subtracted begins before
-                        substraction_result = all_occs[i+1] - all_occs[i]
-                        prec_occ = all_occs[i+1]
-                    elif all_occs[i].rank == 1 and all_occs[i+1].rank == 1:
-                        # no substraction at all here: what should we do ?
-                        # (should not happen)
-                        substraction_result = None
-
-                    if type(substraction_result) == Interval:
-                        result.append(substraction_result)
-                    elif type(substraction_result) == list:
-                        for elt in substraction_result:
-                            result.append(elt)
-                    elif substraction_result is None:
-                        pass
-                    else:
-                        raise TypeError('uknown type result for Interval'
-                                        'substraction_result : %s' %
-                                        type(substraction_result))
-                        #recover = True
-                else:
-                    if all_occs[i] not in prec_occ:
-                        if all_occs[i].rank == 2:
-                            result.append(all_occs[i])
-                    if i == total_len-2:
-                        if all_occs[i+1].rank == 2:
-                            result.append(all_occs[i+1])
+          .. code-block:: python
 
-            all_occs = sorted(result)
+            rota = (ses_a.lazy() + ses_b - holidays) & opening_hours
+            calc_session = rota.evaluate()
 
-        for occ in self.occurences:
-            occ.rank = None
+        *Returns:*
+          :Expression: an :py:class:`expression.Expression`
 
-        return CalculatedSession(result)
+        """
+        from .expression import Expression
+        return Expression(None, (self, ))
 
     def __getitem__(self, _slice):
         """slice operator
@@ -741,12 +1206,7 @@ class Session(object):
 
         """
         rrule_params.setdefault('freq', rrule.DAILY)
-        rrule_params.setdefault('cache', True)
-
-        if 'count' not in rrule_params and 'until' not in rrule_params:
-            rrule_params.setdefault(
-                'until',
-                datetime.datetime.now()+relativedelta(years=+5))
+        self._set_rule_bounds(rrule_params)
 
         if 'dtstart' in rrule_params:
             if isinstance(rrule_params['dtstart'], datetime.date):
@@ -759,12 +1219,60 @@ class Session(object):
                     hours=self.start_hour,
                     minutes=self.start_minute)
         self.set.rrule(rrule.rrule(**rrule_params))
-        self._recalculate_occurences()
+        self._dirty = True
         self.rules.append({'type': 'add',
                            'label': label,
                            'rule': rrule_params})
         return self
 
+    def _set_rule_bounds(self, rrule_params):
+        """caps the rules without *count* nor *until* at now + 5 years, or
+        starts the horizon if the session has one (see *horizon*)
+        """
+        if 'count' not in rrule_params and 'until' not in rrule_params:
+            if self.horizon is None:
+                rrule_params.setdefault(
+                    'until',
+                    datetime.datetime.now()+relativedelta(years=+5))
+            else:
+                # the rrule cache would keep all the occurences ever
+                # calculated: not for open-ended rules
+                rrule_params.setdefault('cache', False)
+                if self._horizon_end is None:
+                    self._horizon_end = (datetime.datetime.now() +
+                                         self.horizon)
+        rrule_params.setdefault('cache', True)
+
+    def add_rules(self, rules):
+        """add many recuring rules for this Session
+
+        The occurences are calculated only once, at first access, instead
+        of once per rule. A session defined with 20 rules is
+        therefore expanded once instead of 20 times.
+
+        usage examples:
+
+          .. code-block:: python
+
+              my_session.add_rules([
+                  {'label': "monday", 'freq': rrule.WEEKLY,
+                   'dtstart': datetime.date(2011, 8, 22)},
+                  {'label': "tuesday", 'freq': rrule.WEEKLY,
+                   'dtstart': datetime.date(2011, 8, 23)},
+              ])
+
+        *Args:*
+          :rules: (list of dict): the arguments of
+            :py:meth:`schedule.Session.add_rule` for each rule: *label*
+            and the rrule parameters
+
+        """
+        for rule in rules:
+            rrule_params = dict(rule)
+            label = rrule_params.pop('label', "")
+            self.add_rule(label, **rrule_params)
+        return self
+
     def exclude_rule(self, label="", **rrule_params):
         """exclude a recuring rrule to this Session
 
@@ -772,12 +1280,7 @@ class Session(object):
 
         """
         rrule_params.setdefault('freq', rrule.DAILY)
-        rrule_params.setdefault('cache', True)
-
-        if 'count' not in rrule_params and 'until' not in rrule_params:
-            rrule_params.setdefault(
-                'until',
-                datetime.datetime.now()+relativedelta(years=+5))
+        self._set_rule_bounds(rrule_params)
 
         if 'dtstart' in rrule_params:
             if isinstance(rrule_params['dtstart'], datetime.date):
@@ -791,7 +1294,7 @@ class Session(object):
                     minutes=self.start_minute)
 
         self.set.exrule(rrule.rrule(**rrule_params))
-        self._recalculate_occurences()
+        self._dirty = True
         self.rules.append({'type': 'exclude',
                            'label': label,
                            'rule': rrule_params})
@@ -804,17 +1307,62 @@ class Session(object):
         :py:meth:`schedule.Session.exclude_rule` in order to maintain
         a static list of Intervals based on the rrule given in input.
 
+        When all the rules are simple periodic ones (see
+        :py:func:`expander.expand`), they are expanded without dateutil.
+
+        If the session has open-ended rules (see *horizon*), the
+        occurences are calculated up to the horizon end only.
+
+        The occurences already evicted (see
+        :py:meth:`schedule.Session.evict`) are only counted in the total
+        duration.
+
         """
         # after adding a rule, we need to recompute the interval list
+        self._dirty = False
+        if self.retention is not None:
+            before = datetime.datetime.now() - self.retention
+            if self._evicted_until is None or before > self._evicted_until:
+                self._evicted_until = before
         new_occurences = []
         new_total_duration = 0
-        for occ in list(self.set):
-            new_occurences.append(Interval(
-                occ,
-                occ+relativedelta(minutes=+self.duration)))
+        new_evicted_duration = 0
+        last_evicted = None
+        # the simple periodic rules are expanded without dateutil (see
+        # expander)
+        starts = expand_rules(self.rules)
+        if starts is None:
+            starts = self.set
+        if isinstance(self.duration, int):
+            duration = datetime.timedelta(minutes=self.duration)
+        else:
+            duration = relativedelta(minutes=+self.duration)
+        for occ in starts:
+            if self._horizon_end is not None and occ > self._horizon_end:
+                break
+            interv = Interval(occ, occ + duration)
             new_total_duration += self.duration
-        self.occurences = new_occurences
+            if self._evicted_until is not None and \
+                    interv.end < self._evicted_until:
+                # keep only the last one (see evict)
+                if last_evicted is not None:
+                    new_evicted_duration += last_evicted.duration()
+                last_evicted = interv
+                continue
+            if last_evicted is not None:
+                new_occurences.append(last_evicted)
+                last_evicted = None
+            new_occurences.append(interv)
+        if last_evicted is not None:
+            new_occurences.append(last_evicted)
+        # only the changed range is recorded (see SRules), and the
+        # occurences are kept as they are if nothing changed
+        changed = _diff_range(self._occurences, new_occurences)
+        if changed is not None:
+            self.occurences = new_occurences
+            self._record_change(*changed)
         self.total_duration = new_total_duration
+        self._evicted_duration = new_evicted_duration
 
     def get_rules(self):
         """Returns the list of rrules
@@ -824,8 +1372,12 @@ class Session(object):
 
         *Returns:*
           :list: a list of all the rrules in the rrule set for this session
+            (up to the horizon end, if the session has a *horizon*)
 
         """
+        if self._horizon_end is not None:
+            return [occ for occ in self.set.between(
+                datetime.datetime.min, self._horizon_end, True)]
         return list(self.set)
 
     def get_occurences(self):
@@ -853,17 +1405,309 @@ class Session(object):
                                   True is like [start-end]
                                   False is like ]start-end[
 
-        +Returns:*
+        *Returns:*
           :CalculatedSession: a :py:class:`schedule.CalculatedSession`
-            containing all the Interval within start and end
+            containing all the Interval starting within start and end
+            (for a CalculatedSession: all the Interval overlapping
+            start and end, see
+            :py:meth:`schedule.CalculatedSession._between_bounds`)
+
+        The Intervals are taken from the calculated occurences (found by
+        binary search): O(log n + k). If they are not all calculated
+        (evicted occurences, see :py:meth:`schedule.Session.evict`), they
+        are generated from the rules (see
+        :py:meth:`schedule.Session.iter_between`).
+
+        """
+        self._ensure_horizon(end)
+        self.occurences  # (calculated if needed)
+        if self.rules and not self._is_calculated(start, end):
+            return CalculatedSession._from_sorted(
+                list(self.iter_between(start, end, inclusive)))
+        low, high = self._between_bounds(start, end, inclusive)
+        return CalculatedSession._from_sorted(self.occurences[low:high])
+
+    def iter_between(self, start, end, inclusive=True):
+        """Iterate over the occurences between two dates, one by one
+
+        Same as :py:meth:`schedule.Session.between`, but the Intervals are
+        yielded one at a time instead of being returned in a new
+        CalculatedSession.
+
+        If the occurences of the period are not calculated (rules added
+        since, period beyond the horizon, evicted occurences), they are
+        generated from the rules on the fly, and not kept: it runs in
+        constant memory, whatever the length of the period.
+
+        usage example:
+
+          .. code-block:: python
+
+            for interv in my_session.iter_between(start, end):
+                export(interv)
+
+        *Args:*
+          :start: (datetime) : the date and time starting the period
+          :end: (datetime) : the date and time ending the period
+          :inclusive: (boolean) : see :py:meth:`schedule.Session.between`
+
+        *Returns:*
+          :generator: the Intervals, sorted
+
+        """
+        if self.rules and not self._is_calculated(start, end):
+            for occ in self._uncached_set():
+                if occ < start or (not inclusive and occ == start):
+                    continue
+                if occ > end or (not inclusive and occ == end):
+                    break
+                yield Interval(occ, occ+relativedelta(minutes=+self.duration))
+        else:
+            occurences = self.occurences
+            low, high = self._between_bounds(start, end, inclusive)
+            for pos in range(low, high):
+                yield occurences[pos]
+
+    def _iter_window(self, start, end):
+        """Iterate over the occurences overlapping (or touching) the period
+        between *start* and *end*, sorted
+
+        As :py:meth:`schedule.Session.iter_between`, the occurences are
+        generated from the rules if they are not calculated.
+        """
+        if self.rules and not self._is_calculated(start, end):
+            first = start - relativedelta(minutes=+self.duration)
+            for occ in self._uncached_set():
+                if occ < first:
+                    continue
+                if occ > end:
+                    break
+                yield Interval(occ, occ+relativedelta(minutes=+self.duration))
+        else:
+            occurences = self.occurences
+            starts, max_ends = self._get_index()
+            for pos in range(bisect_left(max_ends, start),
+                             bisect_right(starts, end)):
+                if occurences[pos].end >= start:
+                    yield occurences[pos]
+
+    def _uncached_set(self):
+        """returns a copy of the rruleset whose rrules do not cache their
+        occurences: the rrules of *self.set* keep all the occurences they
+        ever generated (see *cache* in
+        :py:meth:`schedule.Session._set_rule_bounds`)
+        """
+        rruleset = rrule.rruleset()
+        for rule in self.rules:
+            rrule_params = dict(rule['rule'], cache=False)
+            if rule['type'] == 'exclude':
+                rruleset.exrule(rrule.rrule(**rrule_params))
+            else:
+                rruleset.rrule(rrule.rrule(**rrule_params))
+        return rruleset
+
+    def _first_start(self):
+        """returns the start of the first occurence (generated from the
+        rules if it was evicted), or None if there is no occurence
+        """
+        if self.rules and self._evicted_until is not None:
+            return next(iter(self._uncached_set()), None)
+        occurences = self.occurences
+        if not occurences:
+            return None
+        return occurences[0].start
+
+    def _window_occurences(self, start, end):
+        """returns the list of the (complete) occurences overlapping (or
+        touching) the period between *start* and *end*, without calculating
+        the other ones (see :py:meth:`schedule.SRules.between`)
+        """
+        return list(self._iter_window(start, end))
+
+    def _is_calculated(self, start, end):
+        """returns True if the calculated occurences contain all the
+        occurences between *start* and *end*
+        """
+        horizon_end = self._get_horizon_end()
+        return (not self._dirty and
+                (horizon_end is None or end <= horizon_end) and
+                (self._evicted_until is None or start >= self._evicted_until))
+
+    def count_between(self, start, end, inclusive=True):
+        """Return the number of occurences between two dates
+
+        Same as *len(self.between(start, end, inclusive))* (see
+        :py:meth:`schedule.Session.between`), but without building the
+        list: O(log n) (O(k) for a period which is not calculated, as the
+        occurences are then generated from the rules)
+
+        *Args:*
+          :start: (datetime) : the date and time starting the period
+          :end: (datetime) : the date and time ending the period
+          :inclusive: (boolean) : see :py:meth:`schedule.Session.between`
+
+        *Returns:*
+          :int: the number of occurences
+
+        """
+        self._ensure_horizon(end)
+        self.occurences  # (calculated if needed)
+        if self.rules and not self._is_calculated(start, end):
+            return sum(1 for _ in self.iter_between(start, end, inclusive))
+        low, high = self._between_bounds(start, end, inclusive)
+        return high - low
+
+    def index_of(self, the_date=None, inclusive=True):
+        """Return the position (in the occurences) of the next occurence
+        for a given date: the occurence containing the date if inclusive is
+        True, else the first one starting after the date
+
+        Used for paging: *self.occurences[pos:pos + 10]* are the next 10
+        occurences. It runs in O(log n). The positions are only known after
+        the eviction date (see :py:meth:`schedule.Session.evict`): ValueError
+        is raised for a date before it.
+
+        usage example:
+
+          .. code-block:: python
+
+            pos = my_srules.index_of(datetime.datetime.now())
+            if pos is not None:
+                page = my_srules[pos:pos + 10]
+
+        *Args:*
+          :the_date: (datetime), by default if not given : now()
+          :inclusive: (boolean)
+
+        *Returns:*
+          :int: the position, or None if there is no next occurence
+
+        """
+        if the_date is None:
+            the_date = datetime.datetime.now()
+        self._check_not_evicted(the_date)
+        self._ensure_horizon(the_date)
+        if self.occurences and the_date < self.occurences[0].start:
+            return 0
+        return self._next_index(the_date, inclusive)
+
+    def nth_after(self, the_date, nth, inclusive=True):
+        """Return the nth occurence after a given date, without building
+        the list of the previous ones: O(log n)
+
+        *nth_after(the_date, 0)* is the next occurence (see
+        :py:meth:`schedule.Session.index_of`), *nth_after(the_date, 1)*
+        the one after, ...
+
+        *Args:*
+          :the_date: (datetime)
+          :nth: (int) : 0 for the next occurence
+          :inclusive: (boolean) : see :py:meth:`schedule.Session.index_of`
+
+        *Returns:*
+          :Interval: the occurence, or None if there is not enough
+                     occurences
+
+        """
+        if nth < 0:
+            raise ValueError("nth should be positive")
+        pos = self.index_of(the_date, inclusive)
+        if pos is None:
+            return None
+        pos += nth
+        # the occurence can be after the horizon (see _next_index)
+        if pos >= len(self.occurences) and \
+                self._get_horizon_end() is not None:
+            limit = the_date + relativedelta(years=+5)
+            while pos >= len(self.occurences) and \
+                    self._get_horizon_end() < limit:
+                self._extend_horizon(self._get_horizon_end())
+        if pos >= len(self.occurences):
+            return None
+        return self.occurences[pos]
+
+    def duration_between(self, start, end):
+        """Return the duration of the occurences between two dates
+
+        The occurences which start before *start* or end after *end* only
+        count for their part between the two dates.
+
+        It uses the cumulative durations of the occurences, so it runs in
+        O(log n) (plus the number of occurences which overlap each other
+        at *start* or *end*).
+
+        usage example:
+
+          .. code-block:: python
+
+            worked = my_srules.duration_between(datetime.datetime(2012, 3, 1),
+                                                datetime.datetime(2012, 4, 1))
+
+        *Args:*
+          :start: (datetime) : the date and time starting the period
+          :end: (datetime) : the date and time ending the period
+
+        *Returns:*
+          :int: the duration in seconds (0 if *end* is before *start*)
+
+        """
+        return int(self._duration_between(start, end).total_seconds())
 
+    def _duration_between(self, start, end):
+        """returns the exact duration (timedelta) of the occurences between
+        two dates (see :py:meth:`schedule.Session.duration_between`)
         """
-        occurences = []
-        for occ in list(self.set.between(start, end, inclusive)):
-            occurences.append(Interval(
-                occ,
-                occ+relativedelta(minutes=+self.duration)))
-        return CalculatedSession(occurences)
+        if end < start:
+            return datetime.timedelta(0)
+        self._ensure_horizon(end)
+        if self._evicted_before(start):
+            # the evicted occurences are generated again (see _iter_window)
+            # up to the eviction date, the calculated ones are used after
+            evicted_until = min(self._evicted_until, end)
+            total = datetime.timedelta(0)
+            for occ in self._iter_window(start, evicted_until):
+                total += min(occ.end, evicted_until) - max(occ.start, start)
+            if end > evicted_until:
+                total += self._duration_between(evicted_until, end)
+            return total
+        occurences = self.occurences
+        starts, max_ends = self._get_index()
+        durations = self._get_durations()
+        low = bisect_left(max_ends, start)
+        high = bisect_right(starts, end)
+        if high <= low:
+            return datetime.timedelta(0)
+        total = datetime.timedelta(seconds=durations[high] - durations[low])
+        # the parts before start
+        for pos in range(low, bisect_left(starts, start, low, high)):
+            occ = occurences[pos]
+            total -= min(occ.end, start) - occ.start
+        # the parts after end (the ones before pos all end before end)
+        pos = high - 1
+        while pos >= low and max_ends[pos] > end:
+            occ = occurences[pos]
+            if occ.end > end:
+                total -= occ.end - max(occ.start, end)
+            pos -= 1
+        return total
+
+    def _between_bounds(self, start, end, inclusive=True):
+        """returns the (low, high) positions of the occurences starting
+        between two dates: they are *self.occurences[low:high]*
+
+        The positions are found by binary search on the (already
+        calculated) occurences, so the rruleset is not expanded again.
+        """
+        starts, max_ends = self._get_index()
+        if inclusive:
+            low = bisect_left(starts, start)
+            high = bisect_right(starts, end)
+        else:
+            low = bisect_right(starts, start)
+            high = bisect_left(starts, end)
+        if high < low:
+            high = low
+        return low, high
 
     def next_interval(self, the_date=None, inclusive=True):
         """Returns the next interval (Interval) for a given date.
@@ -955,6 +1799,9 @@ class CalculatedSession(Session):
         :Interval list: a list of Intervals
         :Session: a Session object
         :CalculatedSession: another CalculatedSession object
+        :IntervalArray: an :py:class:`intervalarray.IntervalArray`, kept
+                        as the storage of the occurences (16 bytes per
+                        Interval)
         :None: None object (resulting to an empty CalculatedSession object)
 
     """
@@ -963,10 +1810,51 @@ class CalculatedSession(Session):
         Session.__init__(self)
 
         if type(const_list) == list:
-            self.occurences = sorted(const_list)
+            self.occurences = sorted(const_list, key=Interval.key)
         elif (type(const_list) == Session or
               type(const_list) == CalculatedSession):
-            self.occurences = sorted(const_list.occurences)
+            if isinstance(const_list.occurences, IntervalArray):
+                self.occurences = const_list.occurences
+            else:
+                self.occurences = sorted(const_list.occurences,
+                                         key=Interval.key)
+        elif isinstance(const_list, IntervalArray):
+            # (kept as it is: the Intervals are created when they are read)
+            self.occurences = const_list
+
+    @classmethod
+    def _from_sorted(cls, occurences):
+        """build a CalculatedSession from an Interval list which is already
+        sorted (as the results of :py:mod:`operations`), without sorting it
+        again
+        """
+        calc_session = CalculatedSession()
+        calc_session.occurences = occurences
+        return calc_session
+
+    @property
+    def total_duration(self):
+        """the total duration of the occurences, in seconds (including the
+        evicted ones)
+
+        .. note:: unlike :py:attr:`schedule.Session.total_duration`, which
+           is in minutes.
+
+        It is read from the cumulative durations of the occurences (see
+        :py:meth:`schedule.Session._get_durations`): O(1) once they are
+        built.
+        """
+        return self._evicted_duration + self._get_durations()[-1]
+
+    def _evicted_before(self, the_date):
+        # (no rules: the evicted occurences can not be generated again)
+        self._check_not_evicted(the_date)
+        return False
+
+    def _iter_window(self, start, end):
+        #see :py:meth:`schedule.Session._iter_window`
+        self._evicted_before(start)  # (ValueError if evicted)
+        return Session._iter_window(self, start, end)
 
     def add_rule(self, label="", **rrule_params):
         raise NotImplementedError(
@@ -985,63 +1873,39 @@ class CalculatedSession(Session):
             "'CalculatedSession' object does not implement "
             "'_recalculate_occurences'")
 
-    def between(self, start, end, inclusive=True):
-        #see :py:meth:`schedule.Session.between`
-        start_interv = self.next_interval(start, inclusive)
-        end_interv = self.prev_interval(end, inclusive)
-        result = []
-        start_to_add = False
-        for interv in self.occurences:
-            if interv == start_interv:
-                start_to_add = True
-            if start_to_add:
-                result.append(interv)
-            if interv == end_interv:
-                start_to_add = False
-        return CalculatedSession(result)
+    def _between_bounds(self, start, end, inclusive=True):
+        """returns the (low, high) positions of the occurences between two
+        dates: they are *self.occurences[low:high]*
+        (used by :py:meth:`schedule.Session.between`)
+
+        * if inclusive, the occurences which contain (or touch) *start* or
+          *end* are included
+        * if not, only the occurences entirely after *start* and before
+          *end* are included
+
+        """
+        self._evicted_before(start)  # (ValueError if evicted)
+        starts, max_ends = self._get_index()
+        if inclusive:
+            low = bisect_left(max_ends, start)
+            high = bisect_right(starts, end)
+        else:
+            low = bisect_right(starts, start)
+            high = bisect_left(max_ends, end)
+        if high < low:
+            high = low
+        return low, high
 
     def next_interval(self, the_date=None, inclusive=True):
         #see :py:meth:`schedule.Session.next_interval`
-        # some shotcuts (occurences are sorted):
-        if the_date is None:
-            the_date = datetime.datetime.now()
-
-        if self.occurences[0].start > the_date:
+        pos = self._next_index(the_date, inclusive)
+        if pos is None:
             return None
-        if self.occurences[-1].end < the_date:
-            return None
-        return_next = False
-        for elt in self.occurences:
-            if return_next:
-                return elt
-            if the_date in elt and inclusive:
-                return elt
-            if elt.end < the_date:
-                continue
-            if elt.end >= the_date:
-                if elt.start > the_date:
-                    return elt
-                else:
-                    return_next = True
-        return None
+        return self.occurences[pos]
 
     def prev_interval(self, the_date=None, inclusive=True):
         #see :py:meth:`schedule.Session.prev_interval`
-        # some shotcuts (occurences are sorted):
-        if the_date is None:
-            the_date = datetime.datetime.now()
-
-        if self.occurences[0].start > the_date:
-            return None
-        if self.occurences[-1].end < the_date:
+        pos = self._prev_index(the_date, inclusive)
+        if pos is None:
             return None
-        last_period = None
-        for elt in self.occurences:
-            if the_date in elt and inclusive:
-                return elt
-            if the_date in elt and not inclusive:
-                return last_period
-            if the_date < elt.start:
-                return last_period
-            last_period = elt
-        return None
+        return self.occurences[pos]
@@ -0,0 +1,173 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""
+Test for expander module (differential tests against dateutil)
+"""
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import unittest
+import datetime
+import random
+
+# dependencies imports
+from dateutil import rrule
+
+# import here the module / classes to be tested
+from srules import Session
+from srules import session
+from srules.expander import expand, expand_rules
+
+
+def random_rule(freq):
+    """random parameters of a simple periodic rule"""
+    params = {'freq': freq,
+              'dtstart': datetime.datetime(2011, 8, 20) + datetime.timedelta(
+                  days=random.randint(0, 800),
+                  minutes=random.randint(0, 24 * 60 - 1))}
+    if random.random() < 0.5:
+        # (dateutil is very slow to find no match every 7 days)
+        params['interval'] = random.randint(1, 6 if freq == rrule.DAILY
+                                            else 10)
+    if random.random() < 0.3:
+        params['wkst'] = random.choice([random.randint(0, 6), rrule.SU])
+    if random.random() < 0.5:
+        params['byweekday'] = random.choice([
+            random.randint(0, 6), rrule.FR(+2),
+            tuple(random.sample(range(7), random.randint(1, 6)))])
+    if random.random() < 0.3:
+        params['bymonthday'] = random.choice([
+            random.randint(1, 31), random.randint(-31, -1),
+            [random.randint(1, 31), random.randint(-31, -1)]])
+    bound = random.randint(0, 2)
+    if bound != 1:
+        params['count'] = random.randint(0, 200)
+    if bound != 0:
+        params['until'] = params['dtstart'] + datetime.timedelta(
+            days=random.randint(-10, 1500))
+        if random.random() < 0.3:
+            params['until'] = params['until'].date()
+    return params
+
+
+class TestExpand(unittest.TestCase):
+    def setUp(self):
+        random.seed(42)
+
+    def check(self, params):
+        result = expand(params)
+        result_expected = list(rrule.rrule(**params))
+        assert result == result_expected, "bad result ? got %s instead of %s (%s)" % (result, result_expected, params)
+
+    def test_1(self):
+        for _ in range(300):
+            self.check(random_rule(rrule.DAILY))
+
+    def test_2(self):
+        for _ in range(300):
+            self.check(random_rule(rrule.WEEKLY))
+
+    def test_3(self):
+        # dates, microseconds, no filter
+        self.check({'freq': rrule.WEEKLY, 'byweekday': (),
+                    'dtstart': datetime.date(2011, 8, 20),
+                    'until': datetime.date(2011, 10, 20)})
+        self.check({'freq': rrule.WEEKLY, 'bymonthday': 0,
+                    'dtstart': datetime.datetime(2011, 8, 20, 8, 0, 0, 5),
+                    'count': 10})
+        self.check({'freq': rrule.DAILY, 'bymonthday': 31, 'interval': 7,
+                    'dtstart': datetime.datetime(2011, 8, 20, 8),
+                    'count': 10})
+
+    def test_4(self):
+        # not supported: dateutil is used
+        dtstart = datetime.datetime(2011, 8, 20)
+        for params in ({'freq': rrule.MONTHLY, 'dtstart': dtstart,
+                        'count': 10},
+                       {'freq': rrule.DAILY, 'dtstart': dtstart},
+                       {'freq': rrule.DAILY, 'count': 10},
+                       {'freq': rrule.DAILY, 'dtstart': dtstart,
+                        'count': 10, 'byhour': (8, 12)},
+                       {'freq': rrule.WEEKLY, 'dtstart': dtstart,
+                        'count': 10, 'bysetpos': 1}):
+            result = expand(params)
+            assert result is None, "bad result ? got %s instead of None" % result
+
+    def test_5(self):
+        dtstart = datetime.datetime(2011, 8, 20, 8)
+        rules = [{'type': 'add', 'rule': {
+                      'freq': rrule.DAILY, 'dtstart': dtstart, 'count': 50}},
+                 {'type': 'add', 'rule': {
+                      'freq': rrule.WEEKLY, 'dtstart': dtstart,
+                      'byweekday': (5, 6), 'count': 50}},
+                 {'type': 'exclude', 'rule': {
+                      'freq': rrule.DAILY, 'dtstart': dtstart,
+                      'interval': 3, 'count': 20}}]
+        rruleset = rrule.rruleset()
+        for rule in rules:
+            if rule['type'] == 'add':
+                rruleset.rrule(rrule.rrule(**rule['rule']))
+            else:
+                rruleset.exrule(rrule.rrule(**rule['rule']))
+        result = expand_rules(rules)
+        result_expected = list(rruleset)
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        rules.append({'type': 'add', 'rule': {
+            'freq': rrule.MONTHLY, 'dtstart': dtstart, 'count': 10}})
+        result = expand_rules(rules)
+        assert result is None, "bad result ? got %s instead of None" % result
+
+
+class TestSessionExpander(unittest.TestCase):
+    def setUp(self):
+        self.expand_rules = session.expand_rules
+
+    def tearDown(self):
+        session.expand_rules = self.expand_rules
+
+    def build(self):
+        ses = Session("Test", duration=60*8, start_hour=8, start_minute=30)
+        ses.add_rule("week days", freq=rrule.WEEKLY,
+                     dtstart=datetime.date(2011, 8, 20),
+                     until=datetime.date(2013, 8, 20),
+                     byweekday=(0, 1, 2, 3, 4))
+        ses.add_rule("first saturdays", freq=rrule.DAILY,
+                     dtstart=datetime.date(2011, 8, 20),
+                     until=datetime.date(2013, 8, 20),
+                     byweekday=rrule.SA, bymonthday=range(1, 8))
+        ses.exclude_rule("fridays", freq=rrule.WEEKLY, interval=2,
+                         dtstart=datetime.date(2011, 8, 26), count=20)
+        return ses
+
+    def test_1(self):
+        result = self.build().occurences
+        session.expand_rules = lambda rules: None
+        result_expected = self.build().occurences
+        assert len(result) > 400
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+
+if __name__ == "__main__":
+    import sys
+    suite = unittest.findTestCases(sys.modules[__name__])
+    #suite = unittest.TestLoader().loadTestsFromTestCase(Test)
+    unittest.TextTestRunner(verbosity=2).run(suite)
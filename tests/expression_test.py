@@ -0,0 +1,172 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""
+Test for expression module (lazy expressions against the Session
+operators)
+"""
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import unittest
+import datetime
+import random
+
+from dateutil import rrule
+
+# import here the module / classes to be tested
+from srules import Session, CalculatedSession, Expression, Interval
+
+from tests.reference import random_intervals
+
+
+class TestExpression(unittest.TestCase):
+    def setUp(self):
+        random.seed(20111227)
+        self.ses1 = Session("Test1", duration=60*8,
+                            start_hour=13, start_minute=30)
+        self.ses1.add_rule("", freq=rrule.DAILY,
+                           dtstart=datetime.date(2011, 8, 20), interval=2)
+        self.ses2 = Session("Test2", duration=60*3,
+                            start_hour=12, start_minute=00)
+        self.ses2.add_rule("", freq=rrule.DAILY,
+                           dtstart=datetime.date(2011, 8, 20), count=40)
+        self.ses3 = Session("Test3", duration=60*24*3)
+        self.ses3.add_rule("", freq=rrule.MONTHLY,
+                           dtstart=datetime.date(2011, 8, 25), count=10)
+
+
+class TestExpressionOperators(TestExpression):
+    def test_1(self):
+        result = ((self.ses1.lazy() + self.ses2 - self.ses3) &
+                  self.ses2).evaluate()
+        result_expected = (self.ses1 + self.ses2 - self.ses3) & self.ses2
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_2(self):
+        """random expressions, against the Session operators"""
+        for _ in range(200):
+            sessions = [CalculatedSession(list(CalculatedSession(
+                random_intervals(random.randint(0, 20), spread=3000)) +
+                None)) for _ in range(4)]
+            expression = sessions[0].lazy()
+            result_expected = sessions[0] + None
+            for session in sessions[1:]:
+                operator = random.choice(('__add__', '__sub__', '__and__'))
+                expression = getattr(expression, operator)(session)
+                result_expected = getattr(result_expected, operator)(session)
+            result = expression.evaluate().occurences
+            result_expected = result_expected.occurences
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_3(self):
+        interv = Interval(datetime.datetime(2011, 8, 21),
+                          datetime.datetime(2011, 8, 22))
+        the_date = datetime.datetime(2011, 8, 20, 15)
+        result = (self.ses1.lazy() - interv - the_date + None).evaluate()
+        result_expected = self.ses1 - interv - the_date + None
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        self.assertRaises(TypeError, self.ses1.lazy().__add__, 12)
+
+    def test_4(self):
+        expression = self.ses1.lazy() + self.ses2.lazy() + self.ses3
+        assert isinstance(expression, Expression)
+        result = list(expression)
+        result_expected = (self.ses1 + self.ses2 + self.ses3).occurences
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        assert expression._result is None
+
+    def test_5(self):
+        """overlapping Intervals, datetimes, empty operands"""
+        origin = datetime.datetime(2011, 8, 20)
+        for _ in range(300):
+            operands = []
+            for _ in range(5):
+                kind = random.randint(0, 3)
+                if kind == 0:
+                    operands.append(origin + datetime.timedelta(
+                        minutes=random.randint(0, 3000)))
+                elif kind == 1:
+                    operands.append(CalculatedSession([]))
+                else:
+                    operands.append(CalculatedSession(random_intervals(
+                        random.randint(1, 10), spread=3000)))
+            operands[0] = CalculatedSession(random_intervals(
+                random.randint(0, 10), spread=3000))
+            expression = operands[0].lazy()
+            result_expected = operands[0]
+            for operand in operands[1:]:
+                operator = random.choice(('__add__', '__sub__', '__and__'))
+                expression = getattr(expression, operator)(operand)
+                result_expected = getattr(result_expected, operator)(operand)
+            result = expression.evaluate().occurences
+            result_expected = result_expected.occurences
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+            result = list(expression)
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_6(self):
+        """long chains of operators"""
+        sessions = [CalculatedSession(random_intervals(5, spread=100000))
+                    for _ in range(1500)]
+        for operator in ('__add__', '__sub__', '__and__'):
+            expression = CalculatedSession(
+                random_intervals(5000, spread=100000)).lazy()
+            result_expected = expression.operands[0]
+            for session in sessions:
+                expression = getattr(expression, operator)(session)
+                result_expected = getattr(result_expected, operator)(session)
+            result = expression.evaluate()
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+
+class TestExpressionCache(TestExpression):
+    def test_1(self):
+        expression = self.ses1.lazy() - self.ses3
+        result = expression.evaluate()
+        assert expression.evaluate().occurences is result.occurences
+
+    def test_2(self):
+        # the evaluated nodes are reused
+        expression = self.ses1.lazy() - self.ses3
+        evaluated = expression.evaluate()
+        total = expression + self.ses2
+        result = total.evaluate()
+        result_expected = self.ses1 - self.ses3 + self.ses2
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        assert expression.evaluate().occurences is evaluated.occurences
+
+    def test_3(self):
+        # a session changed since the evaluation
+        expression = self.ses1.lazy() - self.ses3
+        result = expression.evaluate()
+        self.ses3.add_rule("", freq=rrule.DAILY, count=1,
+                           dtstart=datetime.date(2011, 8, 20))
+        result = expression.evaluate()
+        result_expected = self.ses1 - self.ses3
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+
+if __name__ == "__main__":
+    import sys
+    suite = unittest.findTestCases(sys.modules[__name__])
+    #suite = unittest.TestLoader().loadTestsFromTestCase(Test)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,100 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""
+Test for Interval class
+"""
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import unittest
+import datetime
+import pickle
+
+# import here the module / classes to be tested
+from srules import Interval
+
+
+class TestInterval(unittest.TestCase):
+    def setUp(self):
+        self.interv1 = Interval(datetime.datetime(2011, 9, 27, 13, 30),
+                                datetime.datetime(2011, 9, 27, 21, 30))
+        self.interv2 = Interval(datetime.datetime(2011, 9, 27, 13, 30),
+                                datetime.datetime(2011, 9, 27, 15, 30))
+        self.interv3 = Interval(datetime.datetime(2011, 9, 28, 8, 00),
+                                datetime.datetime(2011, 9, 28, 9, 00))
+
+
+class TestIntervalSlots(TestInterval):
+    def test_1(self):
+        assert not hasattr(self.interv1, '__dict__')
+
+    def test_2(self):
+        self.assertRaises(AttributeError, setattr,
+                          self.interv1, 'start', datetime.datetime.now())
+
+    def test_3(self):
+        self.assertRaises(AttributeError, setattr, self.interv1, 'rank', 1)
+
+    def test_4(self):
+        result = pickle.loads(pickle.dumps(self.interv1))
+        assert result == self.interv1
+
+    def test_5(self):
+        self.assertRaises(ValueError, Interval,
+                          self.interv1.end, self.interv1.start)
+
+
+class TestIntervalOrder(TestInterval):
+    def test_1(self):
+        assert self.interv2 < self.interv1
+
+    def test_2(self):
+        assert self.interv1 < self.interv3
+
+    def test_3(self):
+        assert self.interv1 <= Interval(self.interv1.start, self.interv1.end)
+
+    def test_4(self):
+        result = sorted([self.interv3, self.interv1, self.interv2])
+        result_expected = [self.interv2, self.interv1, self.interv3]
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_5(self):
+        result = sorted([self.interv3, self.interv1, self.interv2],
+                        key=Interval.key)
+        result_expected = [self.interv2, self.interv1, self.interv3]
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_6(self):
+        assert self.interv1 != self.interv2
+        assert not self.interv1 == None
+
+    def test_7(self):
+        assert len(set([self.interv1, self.interv2,
+                        Interval(self.interv1.start, self.interv1.end)])) == 2
+
+
+if __name__ == "__main__":
+    import sys
+    suite = unittest.findTestCases(sys.modules[__name__])
+    #suite = unittest.TestLoader().loadTestsFromTestCase(Test)
+    unittest.TextTestRunner(verbosity=2).run(suite)
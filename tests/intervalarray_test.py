@@ -0,0 +1,263 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""
+Test for intervalarray module (differential tests against the operations
+module)
+"""
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import unittest
+import datetime
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# import here the module / classes to be tested
+from srules import Interval, CalculatedSession, IntervalArray, SRules
+from srules.operations import union, difference, intersection
+
+from tests.reference import random_intervals
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestIntervalArray(unittest.TestCase):
+    def setUp(self):
+        random.seed(20111227)
+
+    def random_inputs(self):
+        left = random_intervals(random.randint(0, 20), spread=3000)
+        right = random_intervals(random.randint(0, 20), spread=3000)
+        return left, right
+
+
+class TestIntervalArrayConversion(TestIntervalArray):
+    def test_1(self):
+        occurences = random_intervals(100)
+        array = IntervalArray.from_intervals(occurences)
+        result = array.to_intervals()
+        result_expected = sorted(occurences, key=Interval.key)
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        assert list(array) == result_expected
+        assert array[3] == result_expected[3]
+        assert array[3:10].to_intervals() == result_expected[3:10]
+        assert len(array) == 100
+        assert array.nbytes == 100 * 16
+
+    def test_2(self):
+        occurences = list(union(random_intervals(100)))
+        calc_session = CalculatedSession(
+            IntervalArray.from_intervals(occurences))
+        assert calc_session.occurences == occurences
+        assert IntervalArray.from_intervals(calc_session) == \
+            IntervalArray.from_intervals(occurences)
+
+    def test_3(self):
+        array = IntervalArray()
+        assert len(array) == 0
+        assert array.to_intervals() == []
+        origin = datetime.datetime(2011, 8, 20)
+        self.assertRaises(ValueError, IntervalArray, [origin],
+                          [origin - datetime.timedelta(hours=1)])
+        self.assertRaises(ValueError, IntervalArray, [origin], [])
+
+
+class TestIntervalArrayOperations(TestIntervalArray):
+    def check(self, function, operator):
+        for _ in range(500):
+            left, right = self.random_inputs()
+            if function is difference:
+                left = list(union(left))
+            result = operator(IntervalArray.from_intervals(left),
+                              IntervalArray.from_intervals(right))
+            result_expected = list(function(left, right))
+            assert result.to_intervals() == result_expected, "bad result ? got %s instead of %s" % (result.to_intervals(), result_expected)
+
+    def test_1(self):
+        self.check(union, IntervalArray.__add__)
+
+    def test_2(self):
+        self.check(difference, IntervalArray.__sub__)
+
+    def test_3(self):
+        self.check(intersection, IntervalArray.__and__)
+
+    def test_4(self):
+        # touching and degenerate Intervals
+        origin = datetime.datetime(2011, 8, 20)
+        hours = [Interval(origin + datetime.timedelta(hours=start),
+                          origin + datetime.timedelta(hours=end))
+                 for start, end in ((0, 1), (1, 2), (3, 3), (4, 6))]
+        others = [Interval(origin + datetime.timedelta(hours=start),
+                           origin + datetime.timedelta(hours=end))
+                  for start, end in ((2, 3), (5, 5), (6, 7))]
+        for function, operator in ((union, IntervalArray.__add__),
+                                   (difference, IntervalArray.__sub__),
+                                   (intersection, IntervalArray.__and__)):
+            result = operator(IntervalArray.from_intervals(hours),
+                              IntervalArray.from_intervals(others))
+            result_expected = list(function(hours, others))
+            assert result.to_intervals() == result_expected, "bad result ? got %s instead of %s" % (result.to_intervals(), result_expected)
+
+
+class TestIntervalArraySession(TestIntervalArray):
+    def test_1(self):
+        # the operators of an IntervalArray-backed CalculatedSession
+        origin = datetime.datetime(2011, 8, 20)
+        for _ in range(300):
+            left, right = self.random_inputs()
+            calc_session = CalculatedSession(
+                IntervalArray.from_intervals(left))
+            the_date = origin + datetime.timedelta(
+                minutes=random.randint(0, 3000))
+            for other in (CalculatedSession(right),
+                          CalculatedSession(
+                              IntervalArray.from_intervals(right)),
+                          Interval(the_date, the_date +
+                                   datetime.timedelta(minutes=90)),
+                          the_date):
+                for operator in ('__add__', '__sub__', '__and__'):
+                    result = getattr(calc_session, operator)(other)
+                    result_expected = getattr(
+                        CalculatedSession(left), operator)(other)
+                    assert result.occurences == \
+                        result_expected.occurences, "bad result ? got %s instead of %s" % (result.occurences, result_expected.occurences)
+                    if len(left) and len(right):
+                        assert isinstance(result.occurences, IntervalArray)
+
+
+class TestIntervalArrayContains(TestIntervalArray):
+    def test_1(self):
+        for _ in range(100):
+            occurences = random_intervals(random.randint(0, 20),
+                                          spread=3000)
+            calc_session = CalculatedSession(occurences)
+            array = IntervalArray.from_intervals(occurences)
+            origin = datetime.datetime(2011, 8, 20)
+            dates = [origin + datetime.timedelta(
+                minutes=random.randint(-10, 3700)) for _ in range(20)]
+            result = list(array.contains(dates))
+            result_expected = [the_date in calc_session
+                               for the_date in dates]
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+            for the_date in dates:
+                interv = Interval(the_date, the_date +
+                                  datetime.timedelta(minutes=30))
+                result = interv in array
+                result_expected = interv in calc_session
+                assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+
+class TestIntervalArrayStorage(TestIntervalArray):
+    """CalculatedSession backed by an IntervalArray, against the same
+    CalculatedSession backed by an Interval list"""
+    def test_1(self):
+        origin = datetime.datetime(2011, 8, 20)
+        for _ in range(50):
+            occurences = random_intervals(random.randint(0, 30),
+                                          spread=3000)
+            calc_session = CalculatedSession(
+                IntervalArray.from_intervals(occurences))
+            reference = CalculatedSession(occurences)
+            assert isinstance(calc_session.occurences, IntervalArray)
+            assert calc_session == reference
+            assert list(calc_session) == reference.occurences
+            assert calc_session.total_duration == reference.total_duration
+            dates = [origin + datetime.timedelta(
+                minutes=random.randint(-10, 3700)) for _ in range(20)]
+            result = list(calc_session.contains_many(dates))
+            result_expected = list(reference.contains_many(dates))
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+            for the_date in dates:
+                end = the_date + datetime.timedelta(minutes=300)
+                for inclusive in (True, False):
+                    for method in ('next_interval', 'prev_interval',
+                                   'index_of'):
+                        result = getattr(calc_session, method)(the_date,
+                                                                inclusive)
+                        result_expected = getattr(reference, method)(
+                            the_date, inclusive)
+                        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+                    result = calc_session.between(the_date, end, inclusive)
+                    result_expected = reference.between(the_date, end,
+                                                        inclusive)
+                    assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+                result = calc_session.duration_between(the_date, end)
+                result_expected = reference.duration_between(the_date, end)
+                assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+                assert (the_date in calc_session) == (the_date in reference)
+
+    def test_2(self):
+        """operators and eviction"""
+        for _ in range(50):
+            left = random_intervals(random.randint(0, 30), spread=3000)
+            right = CalculatedSession(random_intervals(random.randint(0, 30),
+                                                       spread=3000))
+            calc_session = CalculatedSession(
+                IntervalArray.from_intervals(left))
+            reference = CalculatedSession(left)
+            for operator in ('__add__', '__sub__', '__and__'):
+                result = getattr(calc_session, operator)(right)
+                result_expected = getattr(reference, operator)(right)
+                assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+            before = datetime.datetime(2011, 8, 21, 12)
+            result = calc_session.evict(before)
+            result_expected = reference.evict(before)
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+            assert isinstance(calc_session.occurences, IntervalArray)
+            assert calc_session == reference
+            assert calc_session.total_duration == reference.total_duration
+
+    def test_3(self):
+        """sessions of a SRules"""
+        the_date = datetime.datetime(2011, 8, 20, 12)
+        for _ in range(20):
+            srule = SRules("Test")
+            reference = SRules("Reference")
+            for pos in range(4):
+                occurences = random_intervals(random.randint(0, 30),
+                                              spread=3000)
+                calc_session = CalculatedSession(
+                    IntervalArray.from_intervals(occurences))
+                ref_session = CalculatedSession(occurences)
+                if pos % 2:
+                    calc_session.session_type = 'exclude'
+                    ref_session.session_type = 'exclude'
+                srule.add_session(calc_session)
+                reference.add_session(ref_session)
+            result = srule.occurences
+            result_expected = reference.occurences
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+            end = the_date + datetime.timedelta(hours=20)
+            result = srule.between(the_date, end)
+            result_expected = reference.between(the_date, end)
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+
+if __name__ == "__main__":
+    import sys
+    suite = unittest.findTestCases(sys.modules[__name__])
+    #suite = unittest.TestLoader().loadTestsFromTestCase(Test)
+    unittest.TextTestRunner(verbosity=2).run(suite)
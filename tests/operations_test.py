@@ -0,0 +1,209 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""
+Test for operations module (differential tests against the former
+Session operators algorithms)
+"""
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import unittest
+import datetime
+import random
+
+# import here the module / classes to be tested
+from srules import Interval, CalculatedSession
+from srules.operations import union, difference, intersection
+
+from tests.reference import legacy_add, legacy_sub, legacy_and, \
+    random_intervals
+
+
+class TestOperations(unittest.TestCase):
+    def setUp(self):
+        random.seed(20111227)
+
+
+class TestUnion(TestOperations):
+    def test_1(self):
+        """differential test against the former Session.__add__"""
+        for _ in range(500):
+            left = random_intervals(random.randint(1, 20), spread=3000)
+            right = random_intervals(random.randint(1, 20), spread=3000)
+            result = list(union(left, right))
+            # the former algorithm loses the result when everything is
+            # merged in one single Interval
+            if len(result) < 2:
+                continue
+            result_expected = legacy_add(left, right)
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_2(self):
+        """chain-overlapping Intervals are merged in one pass"""
+        origin = datetime.datetime(2011, 8, 20)
+        left = [Interval(origin + datetime.timedelta(hours=2 * i),
+                         origin + datetime.timedelta(hours=2 * i + 3))
+                for i in range(1000)]
+        result = list(union(left, []))
+        result_expected = [Interval(origin,
+                                    origin + datetime.timedelta(hours=2001))]
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_3(self):
+        """touching Intervals are merged, disjoint ones are kept as is"""
+        origin = datetime.datetime(2011, 8, 20)
+        interv1 = Interval(origin, origin + datetime.timedelta(hours=1))
+        interv2 = Interval(origin + datetime.timedelta(hours=1),
+                           origin + datetime.timedelta(hours=2))
+        interv3 = Interval(origin + datetime.timedelta(hours=3),
+                           origin + datetime.timedelta(hours=4))
+        result = list(union([interv1, interv3], [interv2]))
+        result_expected = [Interval(interv1.start, interv2.end), interv3]
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        assert result[1] is interv3
+
+    def test_4(self):
+        left = random_intervals(50)
+        result = CalculatedSession(left) + left[0]
+        result_expected = list(union(left, []))
+        assert result.occurences == result_expected, "bad result ? got %s instead of %s" % (result.occurences, result_expected)
+
+    def test_5(self):
+        """n-ary union, against successive unions"""
+        for nb_inputs in range(6):
+            for _ in range(100):
+                inputs = [random_intervals(random.randint(0, 20),
+                                           spread=3000)
+                          for _ in range(nb_inputs)]
+                result = list(union(*inputs))
+                result_expected = []
+                for occurences in inputs:
+                    result_expected = list(union(result_expected,
+                                                 occurences))
+                assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_6(self):
+        """n-ary union of generators"""
+        inputs = [random_intervals(100) for _ in range(10)]
+        result = list(union(*[iter(occurences) for occurences in inputs]))
+        result_expected = list(union(sorted(sum(inputs, []),
+                                             key=Interval.key)))
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+
+class TestDifference(TestOperations):
+    def test_1(self):
+        """differential test against the former Session.__sub__
+
+        the former algorithm only compares neighbours, so it is only
+        checked when each Interval overlaps at most one other Interval
+        """
+        for _ in range(500):
+            left = list(union(random_intervals(random.randint(1, 8),
+                                               spread=5000), []))
+            right = list(union(random_intervals(random.randint(1, 8),
+                                                spread=5000), []))
+            if [occ for occ in left
+                    if len([o for o in right if o & occ]) > 1] or \
+               [occ for occ in right
+                    if len([o for o in left if o & occ]) > 1]:
+                continue
+            result = list(difference(left, right))
+            # the former algorithm also returns empty (start == end) parts
+            result_expected = [occ for occ in legacy_sub(left, right)
+                               if occ.start < occ.end]
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_2(self):
+        """one Interval cut by many ones"""
+        origin = datetime.datetime(2011, 8, 20)
+        hour = datetime.timedelta(hours=1)
+        left = [Interval(origin, origin + 10 * hour)]
+        right = [Interval(origin + i * hour, origin + i * hour + hour / 2)
+                 for i in range(1, 10)]
+        result = list(difference(left, right))
+        result_expected = [Interval(origin, origin + hour)] + \
+            [Interval(origin + i * hour + hour / 2, origin + (i + 1) * hour)
+             for i in range(1, 10)]
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_3(self):
+        """the operands are not modified"""
+        left = random_intervals(100, spread=3000)
+        right = random_intervals(100, spread=3000)
+        left_copy = [Interval(occ.start, occ.end) for occ in left]
+        right_copy = [Interval(occ.start, occ.end) for occ in right]
+        CalculatedSession(left) - CalculatedSession(right)
+        assert left == left_copy
+        assert right == right_copy
+
+    def test_4(self):
+        """covered Intervals are removed, untouched ones are kept as is"""
+        origin = datetime.datetime(2011, 8, 20)
+        hour = datetime.timedelta(hours=1)
+        interv1 = Interval(origin, origin + hour)
+        interv2 = Interval(origin + 2 * hour, origin + 3 * hour)
+        result = list(difference([interv1, interv2],
+                                 [Interval(origin - hour, origin + hour)]))
+        assert result == [interv2]
+        assert result[0] is interv2
+
+
+class TestIntersection(TestOperations):
+    def test_1(self):
+        """compared to the intersections of all the Interval pairs"""
+        for _ in range(300):
+            left = list(union(random_intervals(random.randint(1, 20),
+                                               spread=3000), []))
+            right = list(union(random_intervals(random.randint(1, 20),
+                                                spread=3000), []))
+            result = list(intersection(left, right))
+            result_expected = sorted([occ & other for occ in left
+                                      for other in right if occ & other],
+                                     key=Interval.key)
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_2(self):
+        """one Interval overlapping many ones (not adjacent once sorted)"""
+        origin = datetime.datetime(2011, 8, 20)
+        hour = datetime.timedelta(hours=1)
+        left = [Interval(origin, origin + 10 * hour)]
+        right = [Interval(origin + i * hour, origin + i * hour + hour / 2)
+                 for i in range(1, 10)]
+        result = (CalculatedSession(left) & CalculatedSession(right))
+        assert result.occurences == right
+        # the former algorithm misses most of them
+        assert len(legacy_and(left, right)) < len(right)
+
+    def test_3(self):
+        left = random_intervals(50)
+        the_date = left[10].start + (left[10].end - left[10].start) / 2
+        result = (CalculatedSession(left) & the_date).occurences
+        result_expected = [Interval(the_date, the_date)]
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+
+if __name__ == "__main__":
+    import sys
+    suite = unittest.findTestCases(sys.modules[__name__])
+    #suite = unittest.TestLoader().loadTestsFromTestCase(Test)
+    unittest.TextTestRunner(verbosity=2).run(suite)
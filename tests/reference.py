@@ -0,0 +1,189 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2012 Link Care Services
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.
+# If not, see <http://www.gnu.org/licenses/gpl.html>
+#
+"""
+Reference implementations of the Session operators
+
+These are the former (re-sort and re-scan) algorithms of the Session
+operators, kept to check the new ones with differential tests.
+"""
+
+__authors__ = [
+    # alphabetical order by last name
+    'Thomas Chiroux', ]
+
+import datetime
+import random
+
+from srules import Interval
+
+
+def legacy_add(left, right):
+    """former Session.__add__ algorithm, on two Interval lists
+    """
+    all_occs = sorted(left + right, key=Interval.key)
+    result = []
+    recover = True
+    while recover:  # continues until only disjoint Intervals are present
+        total_len = len(all_occs)
+        prec_occ = []
+        result = []
+        recover = False
+        for i in range(total_len-1):
+            _and = all_occs[i] & all_occs[i+1]
+            if _and is not None:
+                prec_occ = all_occs[i] + all_occs[i+1]
+                result.append(prec_occ)
+                recover = True
+            else:
+                if all_occs[i] not in prec_occ:
+                    result.append(all_occs[i])
+                if i == total_len-2:
+                    result.append(all_occs[i+1])
+        all_occs = sorted(result, key=Interval.key)
+    return all_occs
+
+
+def random_intervals(nb_intervals, max_duration=600, spread=None):
+    """returns a sorted list of random Intervals (they can overlap)
+
+    *Args:*
+      :nb_intervals: (int) number of Intervals
+      :max_duration: (int) max duration of an interval, in minutes
+      :spread: (int) the Intervals start within *spread* minutes
+    """
+    if spread is None:
+        spread = nb_intervals * max_duration
+    origin = datetime.datetime(2011, 8, 20)
+    result = []
+    for _ in range(nb_intervals):
+        start = origin + datetime.timedelta(minutes=random.randint(0, spread))
+        result.append(Interval(
+            start,
+            start + datetime.timedelta(
+                minutes=random.randint(1, max_duration))))
+    return sorted(result, key=Interval.key)
+
+
+def legacy_sub(left, right):
+    """former Session.__sub__ algorithm, on two Interval lists
+    """
+    all_occs = sorted([(occ, 2) for occ in left] +
+                      [(occ, 1) for occ in right],
+                      key=lambda elt: elt[0].start)
+    result = []
+    total_len = len(all_occs)
+    prec_occ = []
+    for i in range(0, total_len-1):
+        occ, rank = all_occs[i]
+        next_occ, next_rank = all_occs[i+1]
+        _and = occ & next_occ
+        if _and is not None:
+            substraction_result = None
+            if rank == 2 and next_rank == 1:
+                substraction_result = occ - next_occ
+                prec_occ = occ
+            elif rank == 1 and next_rank == 2:
+                substraction_result = next_occ - occ
+                prec_occ = next_occ
+            if type(substraction_result) == Interval:
+                result.append(substraction_result)
+            elif type(substraction_result) == list:
+                for elt in substraction_result:
+                    result.append(elt)
+        else:
+            if occ not in prec_occ:
+                if rank == 2:
+                    result.append(occ)
+            if i == total_len-2:
+                if next_rank == 2:
+                    result.append(next_occ)
+    return sorted(result, key=Interval.key)
+
+
+def legacy_and(left, right):
+    """former Session.__and__ algorithm, on two Interval lists
+    """
+    result = []
+    all_occs = sorted(left + right, key=Interval.key)
+    total_len = len(all_occs)
+    for i in range(0, total_len-2):
+        _and = all_occs[i] & all_occs[i+1]
+        if _and is not None:
+            result.append(_and)
+    return result
+
+
+def legacy_next_interval(occurences, the_date, inclusive=True):
+    """former CalculatedSession.next_interval algorithm
+    """
+    if occurences[0].start > the_date:
+        return None
+    if occurences[-1].end < the_date:
+        return None
+    return_next = False
+    for elt in occurences:
+        if return_next:
+            return elt
+        if the_date in elt and inclusive:
+            return elt
+        if elt.end < the_date:
+            continue
+        if elt.end >= the_date:
+            if elt.start > the_date:
+                return elt
+            else:
+                return_next = True
+    return None
+
+
+def legacy_prev_interval(occurences, the_date, inclusive=True):
+    """former CalculatedSession.prev_interval algorithm
+    """
+    if occurences[0].start > the_date:
+        return None
+    if occurences[-1].end < the_date:
+        return None
+    last_period = None
+    for elt in occurences:
+        if the_date in elt and inclusive:
+            return elt
+        if the_date in elt and not inclusive:
+            return last_period
+        if the_date < elt.start:
+            return last_period
+        last_period = elt
+    return None
+
+
+def legacy_between(occurences, start, end, inclusive=True):
+    """former CalculatedSession.between algorithm
+    """
+    start_interv = legacy_next_interval(occurences, start, inclusive)
+    end_interv = legacy_prev_interval(occurences, end, inclusive)
+    result = []
+    start_to_add = False
+    for interv in occurences:
+        if interv == start_interv:
+            start_to_add = True
+        if start_to_add:
+            result.append(interv)
+        if interv == end_interv:
+            start_to_add = False
+    return result
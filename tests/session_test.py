@@ -27,6 +27,7 @@ __authors__ = [
 
 import unittest
 import datetime
+import random
 
 # dependancies imports
 from dateutil.relativedelta import relativedelta
@@ -34,6 +35,10 @@ from dateutil import rrule
 
 # import here the module / classes to be tested
 from srules import Session, Interval, CalculatedSession
+from srules.operations import union
+
+from tests.reference import random_intervals, legacy_next_interval, \
+    legacy_prev_interval, legacy_between
 
 
 class TestSession(unittest.TestCase):
@@ -143,6 +148,379 @@ class TestSessionAddRule2(TestSession):
         assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
 
 
+class TestSessionAddRules(TestSession):
+    def setUp(self):
+        TestSession.setUp(self)
+        self.rules = [
+            {'label': "jour %s des 6" % day,
+             'freq': rrule.DAILY,
+             'dtstart': datetime.date(2011, 8, 20) + relativedelta(days=+day),
+             'interval': 6,
+             'until': datetime.date(2021, 8, 30)}
+            for day in range(3)]
+
+    def test_1(self):
+        ses = Session("Test", duration=60*8, start_hour=13, start_minute=30)
+        ses.add_rules(self.rules)
+        assert ses == self.ses_p
+        assert ses.total_duration == self.ses_p.total_duration
+        assert [rule['label'] for rule in ses.rules] == \
+            ["jour 0 des 6", "jour 1 des 6", "jour 2 des 6"]
+
+    def test_2(self):
+        """the occurences are calculated once, at first access"""
+        calls = []
+
+        class CountingSession(Session):
+            def _recalculate_occurences(self):
+                calls.append(1)
+                Session._recalculate_occurences(self)
+
+        ses = CountingSession("Test", duration=60*8,
+                              start_hour=13, start_minute=30)
+        ses.add_rules(self.rules)
+        ses.exclude_rule("", freq=rrule.DAILY,
+                         dtstart=datetime.date(2011, 9, 1), count=3)
+        assert len(calls) == 0
+        assert datetime.datetime(2011, 9, 27, 15, 40) in ses
+        assert datetime.datetime(2011, 9, 1, 15, 40) not in ses
+        len(ses)
+        assert len(calls) == 1
+
+
+class TestSessionHorizon(TestSession):
+    """open-ended rule, calculated within a 7 days horizon"""
+    def setUp(self):
+        TestSession.setUp(self)
+        self.today = datetime.datetime.combine(datetime.date.today(),
+                                               datetime.time(0, 0))
+        self.ses = Session("Test", duration=30,
+                           horizon=datetime.timedelta(days=7))
+        self.ses.add_rule("Every hour", freq=rrule.HOURLY,
+                          dtstart=self.today - relativedelta(days=10))
+
+    def test_1(self):
+        assert len(self.ses) <= 18 * 24
+
+    def test_2(self):
+        the_date = self.today + relativedelta(days=100, hours=10, minutes=10)
+        assert the_date in self.ses
+        # calculated up to the date
+        assert len(self.ses) == 110 * 24 + 11
+        assert self.ses.total_duration == (110 * 24 + 11) * 30
+        assert the_date + relativedelta(minutes=30) not in self.ses
+
+    def test_3(self):
+        start = self.today + relativedelta(days=30)
+        result = self.ses.between(start, start + relativedelta(days=1))
+        assert len(result) == 25
+        assert result[0].start == start
+
+    def test_4(self):
+        bounded = Session("Test", duration=30)
+        bounded.add_rule("Every hour", freq=rrule.HOURLY,
+                         dtstart=self.today - relativedelta(days=10),
+                         until=self.today + relativedelta(days=40))
+        self.ses.between(self.today, self.today + relativedelta(days=40))
+        assert self.ses.occurences[:len(bounded)] == bounded.occurences
+
+
+class TestSessionIterBetween(TestSessionHorizon):
+    def check(self, session, start, end):
+        for inclusive in (True, False):
+            result = list(session.iter_between(start, end, inclusive))
+            result_expected = session.between(start, end, inclusive)
+            assert result == result_expected.occurences, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_1(self):
+        # beyond the horizon: generated on the fly
+        start = self.today + relativedelta(days=30)
+        result = list(self.ses.iter_between(start,
+                                            start + relativedelta(days=1)))
+        assert len(result) == 25
+        assert result[0].start == start
+        assert len(self.ses) <= 18 * 24
+        self.check(self.ses, start, start + relativedelta(days=1))
+
+    def test_2(self):
+        # calculated occurences
+        start = self.today + relativedelta(days=2, minutes=10)
+        self.check(self.ses, start, start + relativedelta(days=1))
+        self.check(self.ses, start, start + relativedelta(hours=2, minutes=50))
+
+    def test_3(self):
+        # rules added since the calculation
+        self.ses.add_rule("", freq=rrule.DAILY, count=1,
+                          dtstart=self.today + relativedelta(minutes=10))
+        start = self.today - relativedelta(hours=1)
+        result = list(self.ses.iter_between(start,
+                                            start + relativedelta(hours=3)))
+        assert len(result) == 5
+        assert self.ses._dirty
+        self.check(self.ses, start, start + relativedelta(hours=3))
+
+    def test_4(self):
+        calc_session = CalculatedSession(random_intervals(100))
+        start = calc_session[10].start
+        self.check(calc_session, start, calc_session[20].end)
+
+    def test_5(self):
+        # evicted occurences: generated from the rules
+        ses = Session("Test", duration=60*2, start_hour=8)
+        ses.add_rule("", freq=rrule.DAILY,
+                     dtstart=datetime.date(2011, 8, 20), count=100)
+        reference = Session("Reference", duration=60*2, start_hour=8)
+        reference.add_rule("", freq=rrule.DAILY,
+                           dtstart=datetime.date(2011, 8, 20), count=100)
+        ses.evict(datetime.datetime(2011, 10, 1))
+        start = datetime.datetime(2011, 8, 25, 8)
+        end = datetime.datetime(2011, 10, 10)
+        for inclusive in (True, False):
+            result = ses.between(start, end, inclusive)
+            result_expected = reference.between(start, end, inclusive)
+            assert len(result) > 40
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+            result = ses.count_between(start, end, inclusive)
+            result_expected = len(result_expected)
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        self.check(ses, start, end)
+
+    def test_6(self):
+        # the rrules do not keep the generated occurences
+        ses = Session("Test", duration=30)
+        ses.add_rule("", freq=rrule.HOURLY,
+                     dtstart=datetime.date(2011, 8, 20),
+                     until=datetime.date(2016, 8, 20))
+        start = datetime.datetime(2016, 8, 1)
+        result = list(ses.iter_between(start, start + relativedelta(days=1)))
+        assert len(result) == 25
+        assert ses._dirty
+        for _rrule in ses.set._rrule:
+            assert not _rrule._cache, "%d cached occurences" % len(_rrule._cache)
+        result = list(ses._iter_window(start, start + relativedelta(days=1)))
+        assert len(result) == 25
+        for _rrule in ses.set._rrule:
+            assert not _rrule._cache, "%d cached occurences" % len(_rrule._cache)
+
+
+class TestSessionDurationBetween(TestSession):
+    def brute_force(self, session, start, end):
+        total = 0
+        for occ in session.occurences:
+            if occ.end > start and occ.start < end:
+                total += int((min(occ.end, end) -
+                              max(occ.start, start)).total_seconds())
+        return total
+
+    def test_1(self):
+        """random (overlapping) Intervals"""
+        random.seed(20111227)
+        for _ in range(100):
+            calc_session = CalculatedSession(
+                random_intervals(random.randint(0, 30), spread=3000))
+            origin = datetime.datetime(2011, 8, 20)
+            for _ in range(10):
+                start = origin + datetime.timedelta(
+                    minutes=random.randint(-100, 3100))
+                end = start + datetime.timedelta(
+                    minutes=random.randint(0, 1000))
+                result = calc_session.duration_between(start, end)
+                result_expected = self.brute_force(calc_session, start, end)
+                assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_2(self):
+        ses = Session("Test", duration=60*8, start_hour=9)
+        ses.add_rule("", freq=rrule.DAILY,
+                     dtstart=datetime.date(2011, 8, 20), count=100)
+        result = ses.duration_between(datetime.datetime(2011, 9, 1, 12),
+                                      datetime.datetime(2011, 9, 3, 10))
+        result_expected = (5 + 8 + 1) * 3600
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        result = ses.duration_between(datetime.datetime(2010, 1, 1),
+                                      datetime.datetime(2013, 1, 1))
+        result_expected = ses.total_duration * 60
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_3(self):
+        calc_session = CalculatedSession(random_intervals(50))
+        result = calc_session.total_duration
+        result_expected = sum(occ.duration() for occ in calc_session)
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_4(self):
+        """end before start, inside an occurence"""
+        ses = Session("Test", duration=60*8, start_hour=0)
+        ses.add_rule("", freq=rrule.DAILY,
+                     dtstart=datetime.date(2011, 8, 20), count=10)
+        result = ses.duration_between(datetime.datetime(2011, 8, 21, 2, 30),
+                                      datetime.datetime(2011, 8, 21, 2))
+        result_expected = 0
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+
+class TestSessionRank(TestSession):
+    def setUp(self):
+        TestSession.setUp(self)
+        random.seed(20111227)
+        self.calc_session = CalculatedSession(list(union(
+            random_intervals(200))))
+        self.origin = datetime.datetime(2011, 8, 20)
+
+    def random_date(self):
+        return self.origin + datetime.timedelta(
+            minutes=random.randint(-100, 200 * 700))
+
+    def test_1(self):
+        for _ in range(200):
+            start = self.random_date()
+            end = start + datetime.timedelta(minutes=random.randint(0, 5000))
+            for inclusive in (True, False):
+                result = self.calc_session.count_between(start, end,
+                                                         inclusive)
+                result_expected = len(self.calc_session.between(start, end,
+                                                                inclusive))
+                assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_2(self):
+        occurences = self.calc_session.occurences
+        for _ in range(200):
+            the_date = self.random_date()
+            for inclusive in (True, False):
+                result = self.calc_session.index_of(the_date, inclusive)
+                result_expected = next(
+                    (pos for pos, occ in enumerate(occurences)
+                     if occ.start > the_date or
+                     (inclusive and occ.end >= the_date)), None)
+                assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+                nth = random.randint(0, 10)
+                result = self.calc_session.nth_after(the_date, nth, inclusive)
+                if result_expected is None or \
+                        result_expected + nth >= len(occurences):
+                    result_expected = None
+                else:
+                    result_expected = occurences[result_expected + nth]
+                assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_3(self):
+        ses = Session("Test", duration=30,
+                      horizon=datetime.timedelta(days=7))
+        today = datetime.datetime.combine(datetime.date.today(),
+                                          datetime.time(0, 0))
+        ses.add_rule("Every hour", freq=rrule.HOURLY, dtstart=today)
+        result = ses.nth_after(today, 24 * 30)
+        result_expected = Interval(today + relativedelta(days=30),
+                                   today + relativedelta(days=30, minutes=30))
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        assert ses.count_between(today, today + relativedelta(days=40)) == \
+            24 * 40 + 1
+        self.assertRaises(ValueError, ses.nth_after, today, -1)
+
+
+class TestSessionContainsMany(TestSessionRank):
+    def check(self, session, dates, result, index):
+        for the_date, in_session, pos in zip(dates, result, index):
+            result_expected = session.in_interval(the_date, True)
+            assert bool(in_session) == (result_expected is not None)
+            if result_expected is None:
+                assert pos == -1
+            else:
+                assert session.occurences[pos] == result_expected, "bad result ? got %s instead of %s" % (session.occurences[pos], result_expected)
+
+    def test_1(self):
+        dates = [self.random_date() for _ in range(500)]
+        dates.append(self.calc_session[3].start)
+        dates.append(self.calc_session[3].end)
+        result, index = self.calc_session.contains_many(dates, True)
+        self.check(self.calc_session, dates, result, index)
+        result_expected = list(self.calc_session.contains_many(iter(dates)))
+        assert list(result) == result_expected
+
+    def test_2(self):
+        # without numpy
+        dates = [self.random_date() for _ in range(500)]
+        result, index = self.calc_session._contains_many_bisect(dates, True)
+        self.check(self.calc_session, dates, result, index)
+        assert self.calc_session._contains_many_bisect([], False) == []
+
+    def test_3(self):
+        # overlapping Intervals, and open-ended rules
+        ses = Session("Test", duration=90,
+                      horizon=datetime.timedelta(days=7))
+        today = datetime.datetime.combine(datetime.date.today(),
+                                          datetime.time(0, 0))
+        ses.add_rule("Every hour", freq=rrule.HOURLY, dtstart=today)
+        dates = [today + datetime.timedelta(minutes=random.randint(0, 60000))
+                 for _ in range(200)]
+        result, index = ses.contains_many(dates, return_index=True)
+        assert all(result)
+        self.check(ses, dates, result, index)
+
+
+class TestSessionIterInInterval(TestSessionRank):
+    def check(self, session, queries):
+        result = list(session.iter_in_interval(queries))
+        result_expected = [(query, session.in_interval(query, True))
+                           for query in queries]
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_1(self):
+        # sorted dates
+        dates = sorted(self.random_date() for _ in range(500))
+        dates.insert(100, dates[100])
+        self.check(self.calc_session, dates)
+
+    def test_2(self):
+        # Intervals (their ends are not sorted), and unsorted dates
+        queries = sorted(random_intervals(300, max_duration=60),
+                         key=Interval.key)
+        self.check(self.calc_session, queries)
+        self.check(self.calc_session,
+                   [self.random_date() for _ in range(300)])
+        self.check(self.calc_session, [])
+        assert list(self.calc_session.iter_in_interval([None])) == \
+            [(None, None)]
+
+    def test_3(self):
+        # overlapping occurences, and open-ended rules
+        ses = Session("Test", duration=90,
+                      horizon=datetime.timedelta(days=7))
+        today = datetime.datetime.combine(datetime.date.today(),
+                                          datetime.time(0, 0))
+        ses.add_rule("Every hour", freq=rrule.HOURLY, dtstart=today)
+        ses.add_rule("", freq=rrule.DAILY, count=3,
+                     dtstart=today + datetime.timedelta(minutes=17))
+        dates = sorted(today + datetime.timedelta(
+            minutes=random.randint(0, 60000)) for _ in range(200))
+        list(ses.iter_in_interval(dates))
+        # (the horizon is extended during the walk)
+        assert len(ses) > 60000 // 60
+        self.check(ses, dates)
+
+
+class TestSessionEviction(TestSession):
+    def test_1(self):
+        total_duration = self.ses_p.total_duration
+        nb_occurences = len(self.ses_p)
+        before = datetime.datetime(2015, 1, 1)
+        nb_evicted = self.ses_p.evict(before)
+        assert len(self.ses_p) == nb_occurences - nb_evicted
+        assert self.ses_p.occurences[0].end < before
+        assert self.ses_p.occurences[1].end >= before
+        assert self.ses_p.total_duration == total_duration
+
+    def test_2(self):
+        """the retention applies when the occurences are recalculated"""
+        ses = Session("Test", duration=60*8, start_hour=13, start_minute=30,
+                      retention=relativedelta(years=1))
+        ses.add_rule("", freq=rrule.DAILY,
+                     dtstart=datetime.date.today() - relativedelta(years=3),
+                     until=datetime.date.today() + relativedelta(days=10))
+        assert len(ses) < 400
+        assert ses.total_duration > 3 * 365 * 60 * 8
+        the_date = datetime.datetime.now() - relativedelta(months=6)
+        assert ses.next_interval(the_date, False).start > the_date
+
+
 class TestSessionInPeriod(TestSession):
     def setUp(self):
         TestSession.setUp(self)
@@ -173,6 +551,44 @@ class TestSessionInPeriod(TestSession):
         assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
 
 
+class TestSessionInPeriodIndex(TestSession):
+    """binary search compared to a linear scan, on overlapping Intervals"""
+    def setUp(self):
+        TestSession.setUp(self)
+        random.seed(20111227)
+        self.occurences = random_intervals(300, spread=30000)
+        self.calc_session = CalculatedSession(self.occurences)
+
+    def scan(self, other):
+        for occ in self.occurences:
+            if type(other) == Interval:
+                if occ.start <= other.start <= other.end <= occ.end:
+                    return occ
+            elif occ.start <= other <= occ.end:
+                return occ
+        return None
+
+    def test_1(self):
+        origin = self.occurences[0].start
+        for _ in range(1000):
+            the_date = origin + datetime.timedelta(
+                minutes=random.randint(-600, 31000))
+            result = self.calc_session.in_interval(the_date, True)
+            result_expected = self.scan(the_date)
+            assert result is result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_2(self):
+        for occ in random_intervals(1000, max_duration=120, spread=30000):
+            result = self.calc_session.in_interval(occ, True)
+            result_expected = self.scan(occ)
+            assert result is result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_3(self):
+        assert self.occurences[-1].end in self.calc_session
+        assert self.occurences[0].start in self.calc_session
+        assert "2011-08-20" not in self.calc_session
+
+
 class TestSessionNextinterval1(TestSession):
     def setUp(self):
         TestSession.setUp(self)
@@ -227,6 +643,114 @@ class TestSessionPrevinterval1(TestSession):
         assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
 
 
+class TestSessionBetween(TestSession):
+    def setUp(self):
+        TestSession.setUp(self)
+        random.seed(20111227)
+
+    def test_1(self):
+        """compared to the rruleset expansion"""
+        origin = datetime.datetime(2011, 8, 15)
+        for _ in range(200):
+            start = origin + datetime.timedelta(
+                minutes=random.randint(0, 10**6))
+            end = start + datetime.timedelta(
+                minutes=random.randint(0, 30000))
+            for inclusive in (True, False):
+                result = self.ses_p.between(start, end, inclusive)
+                result_expected = [
+                    Interval(occ, occ + relativedelta(minutes=+60*8))
+                    for occ in self.ses_p.set.between(start, end, inclusive)]
+                assert result.occurences == result_expected, "bad result ? got %s instead of %s" % (result.occurences, result_expected)
+
+    def test_2(self):
+        start = datetime.datetime(2011, 9, 26, 13, 30)
+        end = datetime.datetime(2011, 10, 1, 13, 30)
+        assert len(self.ses_p.between(start, end)) == 3
+        assert len(self.ses_p.between(start, end, False)) == 1
+
+
+class TestCalculatedSessionNextPrev(TestSession):
+    """binary search compared to the former scan"""
+    def setUp(self):
+        TestSession.setUp(self)
+        random.seed(20111227)
+
+    def check(self, occurences):
+        calc_session = CalculatedSession(occurences)
+        origin = occurences[0].start
+        for _ in range(500):
+            the_date = origin + datetime.timedelta(
+                minutes=random.randint(-600, 31000))
+            for inclusive in (True, False):
+                result = calc_session.next_interval(the_date, inclusive)
+                result_expected = legacy_next_interval(
+                    calc_session.occurences, the_date, inclusive)
+                assert result is result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+                result = calc_session.prev_interval(the_date, inclusive)
+                result_expected = legacy_prev_interval(
+                    calc_session.occurences, the_date, inclusive)
+                assert result is result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_1(self):
+        self.check(random_intervals(300, spread=30000))
+
+    def test_2(self):
+        self.check(list(union(random_intervals(300, spread=60000), [])))
+
+    def test_3(self):
+        calc_session = self.ses_p + CalculatedSession([])
+        the_date = datetime.datetime(2011, 9, 27, 15, 40)
+        for inclusive in (True, False):
+            assert calc_session.next_interval(the_date, inclusive) == \
+                self.ses_p.next_interval(the_date, inclusive)
+            assert calc_session.prev_interval(the_date, inclusive) == \
+                self.ses_p.prev_interval(the_date, inclusive)
+
+    def test_4(self):
+        assert CalculatedSession([]).next_interval() is None
+        assert CalculatedSession([]).prev_interval() is None
+
+
+class TestCalculatedSessionBetween(TestSession):
+    def setUp(self):
+        TestSession.setUp(self)
+        random.seed(20111227)
+        self.calc_session = CalculatedSession(list(union(
+            random_intervals(300, spread=60000), [])))
+
+    def test_1(self):
+        """binary search compared to the former scan"""
+        occurences = self.calc_session.occurences
+        origin = occurences[0].start
+        for _ in range(300):
+            start = origin + datetime.timedelta(
+                minutes=random.randint(0, 50000))
+            end = start + datetime.timedelta(
+                minutes=random.randint(3000, 10000))
+            for inclusive in (True, False):
+                result = self.calc_session.between(start, end, inclusive)
+                result_expected = legacy_between(occurences, start, end,
+                                                 inclusive)
+                assert result.occurences == result_expected, "bad result ? got %s instead of %s" % (result.occurences, result_expected)
+
+    def test_2(self):
+        """a window starting before the first occurence"""
+        occurences = self.calc_session.occurences
+        result = self.calc_session.between(
+            occurences[0].start - datetime.timedelta(days=1),
+            occurences[2].end)
+        assert result.occurences == occurences[:3]
+
+    def test_3(self):
+        """a window between two occurences"""
+        occurences = self.calc_session.occurences
+        result = self.calc_session.between(
+            occurences[2].end + datetime.timedelta(seconds=1),
+            occurences[3].start - datetime.timedelta(seconds=1))
+        assert len(result) == 0
+
+
 class TestSessionAdd1(TestSession):
     def setUp(self):
         TestSession.setUp(self)
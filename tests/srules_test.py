@@ -28,12 +28,15 @@ __authors__ = [
 
 import unittest
 import datetime
+import random
 
 # dependencies imports
+from dateutil.relativedelta import relativedelta
 from dateutil import rrule
 
 # import here the module / classes to be tested
-from srules import Session, SRules
+from srules import Session, SRules, Interval, CalculatedSession
+from srules import schedule
 
 
 class TestSRules(unittest.TestCase):
@@ -71,6 +74,686 @@ class TestIntersection1(TestSRules):
         pass
 
 
+class TestHorizon(unittest.TestCase):
+    """open-ended sessions, calculated within a horizon"""
+    def setUp(self):
+        self.today = datetime.datetime.combine(datetime.date.today(),
+                                               datetime.time(0, 0))
+        self.work = Session("Work", duration=60*8, start_hour=9,
+                            horizon=datetime.timedelta(days=7))
+        self.work.add_rule("", freq=rrule.DAILY, dtstart=self.today.date())
+        self.off = Session("Off", duration=60*24, session_type='exclude',
+                           horizon=datetime.timedelta(days=30))
+        self.off.add_rule("", freq=rrule.WEEKLY, dtstart=self.today.date())
+        self.srule = SRules("Test")
+        self.srule.add_session(self.work)
+        self.srule.add_session(self.off)
+
+    def test_1(self):
+        assert len(self.srule) < 40
+
+    def test_2(self):
+        the_date = self.today + relativedelta(days=365, hours=10)
+        assert the_date in self.srule
+        assert the_date + relativedelta(days=-(365 % 7)) not in self.srule
+
+    def test_3(self):
+        the_date = self.today + relativedelta(days=200, hours=20)
+        result = self.srule.next_interval(the_date)
+        result_expected = self.today + relativedelta(days=201, hours=9)
+        if (200 + 1) % 7 == 0:
+            result_expected += relativedelta(days=1)
+        assert result.start == result_expected, "bad result ? got %s instead of %s" % (result.start, result_expected)
+
+    def test_4(self):
+        # (100 % 7 != 0: a working day)
+        day = self.today + relativedelta(days=100)
+        result_expected = Interval(day + relativedelta(hours=9),
+                                   day + relativedelta(hours=17))
+        for hours in (20, 12):
+            srule = SRules("Work")
+            srule.add_session(self.work)
+            result = srule.prev_interval(day + relativedelta(hours=hours))
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+
+class TestEviction(TestSRules):
+    def setUp(self):
+        TestSRules.setUp(self)
+        self.ses_ex = Session("Holidays", session_type='exclude',
+                              duration=60*24*5)
+        self.ses_ex.add_rule("", freq=rrule.MONTHLY,
+                             dtstart=datetime.date(2011, 8, 20),
+                             until=datetime.date(2013, 8, 20))
+        self.srule = SRules("Test")
+        self.srule.add_session(self.ses1)
+        self.srule.add_session(self.ses_ex)
+        self.srule.add_session(self.ses2)
+        self.reference = SRules("Reference")
+        self.reference.add_session(self.ses1)
+        self.reference.add_session(self.ses_ex)
+        self.reference.add_session(self.ses2)
+        self.total_duration = self.reference._calc_total_duration()
+        # copy before eviction, for the sessions are shared
+        self.reference.occurences = list(self.reference.occurences)
+        self.before = datetime.datetime(2012, 6, 15, 15, 00)
+        self.nb_evicted = self.srule.evict(self.before)
+
+    def test_1(self):
+        assert self.nb_evicted > 0
+        assert len(self.srule) == len(self.reference) - self.nb_evicted
+        assert self.srule.occurences[1].end >= self.before
+        assert self.ses1.occurences[1].end >= self.before
+
+    def test_2(self):
+        assert self.srule._calc_total_duration() == self.total_duration
+
+    def test_3(self):
+        for days in range(0, 60):
+            the_date = self.before + datetime.timedelta(days=days, hours=3)
+            for inclusive in (True, False):
+                assert self.srule.next_interval(the_date, inclusive) == \
+                    self.reference.next_interval(the_date, inclusive)
+                assert self.srule.prev_interval(the_date, inclusive) == \
+                    self.reference.prev_interval(the_date, inclusive)
+
+    def test_4(self):
+        """the evicted occurences are not calculated again"""
+        self.srule._recalculate_occurences()
+        assert len(self.srule) == len(self.reference) - self.nb_evicted
+        assert self.srule._calc_total_duration() == self.total_duration
+
+    def test_5(self):
+        """the periods before the eviction date are generated again"""
+        random.seed(20120615)
+        origin = datetime.datetime(2011, 8, 19)
+        for _ in range(100):
+            start = origin + datetime.timedelta(
+                minutes=random.randint(0, 60*24*320))
+            end = start + datetime.timedelta(
+                minutes=random.randint(0, 60*24*40))
+            working_time = datetime.timedelta(
+                minutes=random.randint(0, 60*24*5))
+            for method, args in (('duration_between', (start, end)),
+                                 ('working_time_between', (start, end)),
+                                 ('add_working_time', (start, working_time)),
+                                 ('__contains__', (start, )),
+                                 ('__contains__', (start, True)),
+                                 ('__contains__', (Interval(start, start +
+                                  datetime.timedelta(minutes=30)), True))):
+                result = getattr(self.srule, method)(*args)
+                result_expected = getattr(self.reference, method)(*args)
+                assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        # (same as self.ses1, not evicted)
+        reference = Session("Test1", duration=60*8,
+                            start_hour=13, start_minute=30)
+        reference.add_rule("", freq=rrule.DAILY,
+                           dtstart=datetime.date(2011, 8, 20), interval=2)
+        start = datetime.datetime(2012, 1, 1)
+        for end in (datetime.datetime(2012, 2, 1), self.before,
+                    datetime.datetime(2012, 9, 1)):
+            result = self.ses1.duration_between(start, end)
+            result_expected = reference.duration_between(start, end)
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        for days in range(4):
+            the_date = start + datetime.timedelta(days=days, hours=15)
+            assert (the_date in self.ses1) == (the_date in reference)
+
+    def test_6(self):
+        """the positions are unknown before the eviction date"""
+        the_date = self.before - datetime.timedelta(days=10)
+        self.assertRaises(ValueError, self.srule.index_of, the_date)
+        self.assertRaises(ValueError, self.srule.nth_after, the_date, 2)
+        self.assertRaises(ValueError, self.srule.next_interval, the_date)
+        self.assertRaises(ValueError, self.srule.prev_interval, the_date)
+        assert self.srule.index_of(self.before) is not None
+        # no rules to generate the evicted occurences again
+        calc_session = CalculatedSession(self.reference.occurences)
+        calc_session.evict(self.before)
+        self.assertRaises(ValueError, calc_session.duration_between,
+                          the_date, self.before)
+        self.assertRaises(ValueError, calc_session.__contains__, the_date)
+        self.assertRaises(ValueError, calc_session.between,
+                          the_date, self.before)
+        assert calc_session.duration_between(self.before, self.before) == \
+            self.reference.duration_between(self.before, self.before)
+
+
+class TestRetention(unittest.TestCase):
+    """total duration of a SRules with retention, against the same SRules
+    without retention"""
+    def sessions(self):
+        ses1 = Session("Work", duration=60*8, start_hour=9)
+        ses1.add_rule("", freq=rrule.DAILY,
+                      dtstart=datetime.date(2011, 8, 20),
+                      until=datetime.date(2013, 8, 20))
+        ses2 = Session("Holidays", session_type='exclude',
+                       duration=60*24*5)
+        ses2.add_rule("", freq=rrule.MONTHLY,
+                      dtstart=datetime.date(2011, 8, 20),
+                      until=datetime.date(2013, 8, 20))
+        ses3 = Session("Extra", duration=60*3, start_hour=20)
+        ses3.add_rule("", freq=rrule.WEEKLY,
+                      dtstart=datetime.date(2011, 8, 21),
+                      until=datetime.date(2013, 8, 20))
+        # overlapping occurences, before and after the eviction date
+        ses4 = Session("Closed", session_type='exclude', duration=60*24*3)
+        ses4.add_rule("", freq=rrule.DAILY, interval=10,
+                      dtstart=datetime.date(2011, 9, 3),
+                      until=datetime.date(2013, 8, 20))
+        return [ses1, ses2, ses3, ses4]
+
+    def check(self, srule, before=None):
+        reference = SRules("Reference")
+        for _session in self.sessions():
+            reference.add_session(_session)
+        if before is not None:
+            srule.evict(before)
+        result = srule.total_duration
+        result_expected = reference.total_duration
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_1(self):
+        """sessions added after the first eviction"""
+        retention = datetime.datetime.now() - \
+            datetime.datetime(2012, 6, 15, 15)
+        srule = SRules("Test", retention=retention)
+        for _session in self.sessions():
+            srule.add_session(_session)
+            assert srule._evicted_until is not None
+        self.check(srule)
+
+    def test_2(self):
+        """same result, whatever the order the sessions are added in"""
+        retention = datetime.datetime.now() - \
+            datetime.datetime(2012, 6, 15, 15)
+        srule = SRules("Test", auto_refresh=False, retention=retention)
+        for _session in self.sessions():
+            srule.add_session(_session)
+        srule._recalculate_occurences()
+        self.check(srule)
+
+    def test_3(self):
+        """sessions with their own retention"""
+        retention = datetime.datetime.now() - \
+            datetime.datetime(2012, 6, 15, 15)
+        srule = SRules("Test")
+        for _session in self.sessions():
+            _session.retention = retention
+            _session.add_rule("", freq=rrule.YEARLY,
+                              dtstart=datetime.date(2011, 8, 20), count=1)
+            srule.add_session(_session)
+        reference = SRules("Reference")
+        for _session in self.sessions():
+            _session.add_rule("", freq=rrule.YEARLY,
+                              dtstart=datetime.date(2011, 8, 20), count=1)
+            reference.add_session(_session)
+        result = srule.total_duration
+        result_expected = reference.total_duration
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_4(self):
+        """evicted twice, then a session changed"""
+        sessions = self.sessions()
+        srule = SRules("Test")
+        for _session in sessions:
+            srule.add_session(_session)
+        srule.evict(datetime.datetime(2012, 1, 1))
+        srule.evict(datetime.datetime(2012, 9, 1))
+        self.check(srule)
+        sessions[3].add_rule("", freq=rrule.DAILY,
+                             dtstart=datetime.date(2011, 12, 1), count=5)
+        srule._recalculate_occurences()
+        reference = SRules("Reference")
+        for _session in self.sessions():
+            reference.add_session(_session)
+        reference.sessions[3].add_rule("", freq=rrule.DAILY,
+                                       dtstart=datetime.date(2011, 12, 1),
+                                       count=5)
+        reference._recalculate_occurences()
+        result = srule.total_duration
+        result_expected = reference.total_duration
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+
+class TestDuration(TestSRules):
+    def setUp(self):
+        TestSRules.setUp(self)
+        self.srule = SRules("Test")
+        self.srule.add_session(self.ses1)
+        self.srule.add_session(self.ses2)
+        self.srule.add_session(self.ses4)
+
+    def test_1(self):
+        result = self.srule.total_duration
+        result_expected = sum(occ.duration() for occ in self.srule)
+        assert result > 0
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_2(self):
+        # every 2 days from 12:00 to 23:00 (merged sessions)
+        result = self.srule.duration_between(
+            datetime.datetime(2011, 9, 1, 13), datetime.datetime(2011, 9, 5))
+        result_expected = 2 * (11 * 3600) - 3600
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+
+class TestWorkingTime(TestDuration):
+    def walk(self, start, working_time):
+        """add working time, interval by interval"""
+        # (next_interval returns None before the first interval)
+        the_date = max(start, self.srule.occurences[0].start)
+        while True:
+            interv = self.srule.next_interval(the_date)
+            if interv is None:
+                return None
+            the_date = max(the_date, interv.start)
+            if the_date + working_time <= interv.end:
+                return the_date + working_time
+            working_time -= interv.end - the_date
+            the_date = interv.end + datetime.timedelta(microseconds=1)
+
+    def test_1(self):
+        random.seed(20111227)
+        origin = datetime.datetime(2011, 8, 19)
+        for _ in range(200):
+            start = origin + datetime.timedelta(
+                seconds=random.randint(0, 3600 * 24 * 30))
+            working_time = datetime.timedelta(
+                seconds=random.randint(0, 3600 * 11 * 10),
+                microseconds=random.randint(0, 999999))
+            result = self.srule.add_working_time(start, working_time)
+            result_expected = self.walk(start, working_time)
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+            if result is not None:
+                assert self.srule.working_time_between(start, result) == \
+                    working_time
+
+    def test_2(self):
+        start = datetime.datetime(2011, 9, 1, 22)
+        the_date = self.srule.add_working_time(start,
+                                               datetime.timedelta(hours=1))
+        assert the_date == datetime.datetime(2011, 9, 1, 23)
+        the_date = self.srule.add_working_time(start,
+                                               datetime.timedelta(hours=2))
+        assert the_date == datetime.datetime(2011, 9, 3, 13)
+        assert self.srule.working_time_between(the_date, start) == \
+            -datetime.timedelta(hours=2)
+        assert self.srule.add_working_time(
+            start, datetime.timedelta(days=10000)) is None
+        self.assertRaises(ValueError, self.srule.add_working_time, start,
+                          datetime.timedelta(hours=-1))
+
+    def test_3(self):
+        # open-ended rules: the horizon is extended
+        today = datetime.datetime.combine(datetime.date.today(),
+                                          datetime.time(0, 0))
+        ses = Session("Work", duration=60*8, start_hour=9,
+                      horizon=datetime.timedelta(days=30))
+        ses.add_rule("", freq=rrule.DAILY, dtstart=today)
+        srule = SRules("Test")
+        srule.add_session(ses)
+        result = srule.add_working_time(today, datetime.timedelta(hours=800))
+        assert result == today + datetime.timedelta(days=99, hours=17)
+
+
+class TestCheckpoints(TestSRules):
+    def setUp(self):
+        TestSRules.setUp(self)
+        self.ses_ex = Session("Holidays", session_type='exclude',
+                              duration=60*24*5)
+        self.ses_ex.add_rule("", freq=rrule.MONTHLY,
+                             dtstart=datetime.date(2011, 8, 20),
+                             until=datetime.date(2013, 8, 20))
+        self.sessions = [self.ses1, self.ses_ex, self.ses2, self.ses3,
+                         self.ses4, self.ses5]
+        self.srule = SRules("Test")
+        for _session in self.sessions:
+            self.srule.add_session(_session)
+
+        # count the session operations
+        self.calls = []
+        self.union = schedule.union
+        self.difference = schedule.difference
+
+        def union(*args):
+            self.calls.append('union')
+            return self.union(*args)
+
+        def difference(*args):
+            self.calls.append('difference')
+            return self.difference(*args)
+        schedule.union = union
+        schedule.difference = difference
+
+    def tearDown(self):
+        schedule.union = self.union
+        schedule.difference = self.difference
+
+    def check(self):
+        reference = SRules("Reference")
+        for _session in self.srule.sessions:
+            reference.add_session(_session)
+        assert self.srule == reference
+
+    def test_1(self):
+        self.srule.remove_session("Test5")
+        assert len(self.calls) == 0
+        self.check()
+
+    def test_2(self):
+        self.srule.move_session(4, 3)
+        assert len(self.calls) == 1
+        self.check()
+
+    def test_3(self):
+        self.ses4.add_rule("", freq=rrule.DAILY,
+                           dtstart=datetime.date(2011, 8, 21), interval=2)
+        self.srule._recalculate_occurences()
+        assert len(self.calls) == 2
+        self.check()
+
+    def test_4(self):
+        self.srule.remove_session(0)
+        assert len(self.calls) == 2
+        self.check()
+
+    def test_5(self):
+        self.ses_ex.session_type = 'add'
+        self.srule._recalculate_occurences()
+        assert len(self.calls) == 1
+        self.check()
+
+
+class TestDirtyRange(TestCheckpoints):
+    def setUp(self):
+        TestCheckpoints.setUp(self)
+        self.srule.in_interval(datetime.datetime(2011, 9, 1))  # (index)
+        self.sizes = []
+
+        def union(*args):
+            self.sizes.append(sum(len(arg) for arg in args))
+            return self.union(*args)
+
+        def difference(*args):
+            self.sizes.append(sum(len(arg) for arg in args))
+            return self.difference(*args)
+        schedule.union = union
+        schedule.difference = difference
+
+    def check(self):
+        TestCheckpoints.check(self)
+        index = self.srule._index
+        self.srule._index = None
+        assert index is None or index == self.srule._get_index()
+
+    def test_1(self):
+        # one holiday added
+        self.ses_ex.add_rule("", freq=rrule.DAILY, count=1,
+                             dtstart=datetime.date(2012, 2, 1))
+        self.srule._recalculate_occurences()
+        assert max(self.sizes) < 10, self.sizes
+        self.check()
+
+    def test_2(self):
+        # one holiday in an other holiday
+        self.ses_ex.add_rule("", freq=rrule.DAILY, count=1,
+                             dtstart=datetime.date(2012, 2, 21))
+        self.srule._recalculate_occurences()
+        assert max(self.sizes) < 10, self.sizes
+        self.check()
+
+    def test_3(self):
+        # an extra working day, overlapping the others
+        self.ses1.add_rule("", freq=rrule.DAILY, count=1,
+                           dtstart=datetime.datetime(2012, 3, 5, 2))
+        self.ses3.add_rule("", freq=rrule.DAILY, count=1,
+                           dtstart=datetime.datetime(2012, 3, 6, 2))
+        self.srule._recalculate_occurences()
+        assert max(self.sizes) < 20, self.sizes
+        self.check()
+
+    def test_4(self):
+        # a lot of changes
+        self.ses_ex.add_rule("", freq=rrule.WEEKLY,
+                             dtstart=datetime.date(2011, 8, 1),
+                             until=datetime.date(2012, 8, 1))
+        self.srule._recalculate_occurences()
+        self.check()
+
+    def test_5(self):
+        # the sessions changed twice since the last calculation
+        self.ses_ex.add_rule("", freq=rrule.DAILY, count=1,
+                             dtstart=datetime.date(2012, 2, 1))
+        self.ses_ex.occurences
+        self.ses_ex.add_rule("", freq=rrule.DAILY, count=1,
+                             dtstart=datetime.date(2012, 5, 1))
+        self.srule._recalculate_occurences()
+        self.check()
+
+    def test_6(self):
+        # evicted occurences: the changed range is not known anymore
+        self.ses_ex.evict(datetime.datetime(2012, 1, 1))
+        self.srule._recalculate_occurences()
+        assert max(self.sizes) > 100, self.sizes
+
+    def test_7(self):
+        # a session changed in a group of add sessions
+        self.srule = SRules("Test", auto_refresh=False)
+        for _session in self.sessions:
+            self.srule.add_session(_session)
+        self.srule._recalculate_occurences()
+        assert len(self.sizes) == 3
+        self.ses3.add_rule("", freq=rrule.DAILY, count=1,
+                           dtstart=datetime.datetime(2012, 3, 6, 2))
+        self.srule._recalculate_occurences()
+        assert len(self.sizes) == 4
+        assert max(self.sizes[3:]) < 20, self.sizes
+        self.check()
+
+
+class TestIterBetween(TestSRules):
+    def setUp(self):
+        TestSRules.setUp(self)
+        self.ses_ex = Session("Holidays", session_type='exclude',
+                              duration=60*24*5)
+        self.ses_ex.add_rule("", freq=rrule.MONTHLY,
+                             dtstart=datetime.date(2011, 8, 20),
+                             until=datetime.date(2013, 8, 20))
+        self.sessions = [self.ses1, self.ses_ex, self.ses2, self.ses3,
+                         self.ses4, self.ses5]
+        self.srule = SRules("Test")
+        for _session in self.sessions:
+            self.srule.add_session(_session)
+
+    def check(self, srule, start, end):
+        result = list(srule.iter_between(start, end))
+        result_expected = [
+            Interval(max(occ.start, start), min(occ.end, end))
+            for occ in srule.between(start, end)]
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_1(self):
+        for start, end in (
+                (datetime.datetime(2011, 8, 1), datetime.datetime(2014, 1, 1)),
+                (datetime.datetime(2011, 9, 2), datetime.datetime(2011, 9, 4)),
+                (datetime.datetime(2011, 9, 20, 14),
+                 datetime.datetime(2011, 9, 20, 14)),
+                (datetime.datetime(2011, 9, 20, 21, 30),
+                 datetime.datetime(2011, 9, 30, 23, 30))):
+            self.check(self.srule, start, end)
+
+    def test_2(self):
+        # rules not calculated yet
+        srule = SRules("Test", auto_refresh=False)
+        for _session in self.sessions:
+            srule.add_session(_session)
+        self.ses_ex.add_rule("", freq=rrule.DAILY, count=1,
+                             dtstart=datetime.date(2012, 2, 1))
+        start = datetime.datetime(2012, 1, 25)
+        end = datetime.datetime(2012, 2, 5)
+        result = list(srule.iter_between(start, end))
+        assert self.ses_ex._dirty
+        srule._recalculate_occurences()
+        self.check(srule, start, end)
+        assert result == list(srule.iter_between(start, end))
+
+    def test_3(self):
+        # open-ended rules, far beyond the horizon
+        today = datetime.datetime.combine(datetime.date.today(),
+                                          datetime.time(0, 0))
+        ses = Session("Work", duration=60*8, start_hour=9,
+                      horizon=datetime.timedelta(days=30))
+        ses.add_rule("", freq=rrule.WEEKLY, dtstart=today,
+                     byweekday=(0, 1, 2, 3, 4))
+        srule = SRules("Test")
+        srule.add_session(ses)
+        horizon_end = ses._get_horizon_end()
+        start = today + relativedelta(years=5)
+        result = list(srule.iter_between(start,
+                                         start + relativedelta(days=7)))
+        assert len(result) == 5
+        assert ses._get_horizon_end() == horizon_end
+        self.check(srule, start, start + relativedelta(days=7))
+
+    def test_4(self):
+        # an excluded occurence crossing the end of the period
+        srule = self.work_with_pause()
+        start = datetime.datetime(2012, 1, 2, 9)
+        end = datetime.datetime(2012, 1, 2, 10, 30)
+        result = list(srule.iter_between(start, end))
+        result_expected = [Interval(start, datetime.datetime(2012, 1, 2, 10))]
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        self.check(srule, start, end)
+        # and crossing its start
+        start = datetime.datetime(2012, 1, 2, 10, 30)
+        end = datetime.datetime(2012, 1, 2, 12)
+        result = list(srule.iter_between(start, end))
+        result_expected = [Interval(datetime.datetime(2012, 1, 2, 11), end)]
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+        self.check(srule, start, end)
+
+    def work_with_pause(self, auto_refresh=True):
+        work = Session("Work", duration=60*10, start_hour=8)
+        work.add_rule("", freq=rrule.DAILY, dtstart=datetime.date(2012, 1, 1),
+                      until=datetime.date(2012, 1, 31))
+        pause = Session("Pause", session_type='exclude', duration=60,
+                        start_hour=10)
+        pause.add_rule("", freq=rrule.DAILY,
+                       dtstart=datetime.date(2012, 1, 1),
+                       until=datetime.date(2012, 1, 31))
+        srule = SRules("Test", auto_refresh=auto_refresh)
+        srule.add_session(work)
+        srule.add_session(pause)
+        return srule
+
+
+class TestPushdown(TestIterBetween):
+    def setUp(self):
+        TestIterBetween.setUp(self)
+        self.stale = SRules("Test", auto_refresh=False)
+        for _session in self.sessions:
+            self.stale.add_session(_session)
+
+    def check(self, start, end):
+        for inclusive in (True, False):
+            result = self.stale.between(start, end, inclusive)
+            result_expected = self.srule.between(start, end, inclusive)
+            assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_1(self):
+        # never calculated
+        assert self.stale.count_between(datetime.datetime(2011, 9, 2),
+                                        datetime.datetime(2011, 9, 4)) == 2
+        for start, end in (
+                (datetime.datetime(2011, 8, 1), datetime.datetime(2014, 1, 1)),
+                (datetime.datetime(2011, 9, 2), datetime.datetime(2011, 9, 4)),
+                # in the middle of merged occurences
+                (datetime.datetime(2011, 9, 20, 14),
+                 datetime.datetime(2011, 9, 20, 14)),
+                (datetime.datetime(2011, 9, 20, 21, 30),
+                 datetime.datetime(2011, 9, 30, 23, 30)),
+                # bounds of the occurences
+                (datetime.datetime(2011, 9, 20, 12),
+                 datetime.datetime(2011, 9, 21, 2))):
+            self.check(start, end)
+        assert len(self.stale.occurences) == 0
+
+    def test_2(self):
+        # a session changed since the calculation
+        self.stale._recalculate_occurences()
+        self.ses_ex.add_rule("", freq=rrule.DAILY, count=1,
+                             dtstart=datetime.date(2012, 2, 1))
+        old_occurences = self.stale.occurences
+        self.srule._recalculate_occurences()
+        self.check(datetime.datetime(2012, 1, 25),
+                   datetime.datetime(2012, 2, 5))
+        assert self.stale.occurences is old_occurences
+
+    def test_3(self):
+        # open-ended rules, far beyond the horizon
+        today = datetime.datetime.combine(datetime.date.today(),
+                                          datetime.time(0, 0))
+        ses = Session("Work", duration=60*8, start_hour=9,
+                      horizon=datetime.timedelta(days=30))
+        ses.add_rule("", freq=rrule.WEEKLY, dtstart=today,
+                     byweekday=(0, 1, 2, 3, 4))
+        srule = SRules("Test")
+        srule.add_session(ses)
+        horizon_end = ses._get_horizon_end()
+        start = today + relativedelta(years=5)
+        assert srule.count_between(start, start + relativedelta(days=7)) == 5
+        result = srule.between(start, start + relativedelta(days=7))
+        assert len(result) == 5
+        assert ses._get_horizon_end() == horizon_end
+        assert len(srule) < 30
+        ses._extend_horizon(start + relativedelta(days=7))
+        srule._recalculate_occurences()
+        result_expected = srule.between(start, start + relativedelta(days=7))
+        assert result == result_expected, "bad result ? got %s instead of %s" % (result, result_expected)
+
+    def test_4(self):
+        # an excluded occurence crossing the bounds of the period
+        self.stale = self.work_with_pause(auto_refresh=False)
+        self.srule = self.work_with_pause()
+        for start, end in (
+                (datetime.datetime(2012, 1, 2, 9),
+                 datetime.datetime(2012, 1, 2, 10, 30)),
+                (datetime.datetime(2012, 1, 2, 10, 30),
+                 datetime.datetime(2012, 1, 2, 12))):
+            self.check(start, end)
+
+    def test_5(self):
+        # touching occurences, merged over the whole year
+        days = Session("Days", duration=60*24)
+        days.add_rule("", freq=rrule.DAILY, dtstart=datetime.date(2012, 1, 1),
+                      until=datetime.date(2012, 12, 31))
+        nights = Session("Nights", duration=60*12, start_hour=12)
+        nights.add_rule("", freq=rrule.DAILY,
+                        dtstart=datetime.date(2012, 12, 31),
+                        until=datetime.date(2013, 1, 10))
+        pause = Session("Pause", session_type='exclude', duration=60,
+                        start_hour=10)
+        pause.add_rule("", freq=rrule.DAILY, count=1,
+                       dtstart=datetime.date(2012, 3, 1))
+        self.stale = SRules("Test", auto_refresh=False)
+        self.srule = SRules("Test")
+        for srule in (self.stale, self.srule):
+            for _session in (days, nights, pause):
+                srule.add_session(_session)
+        for start, end in (
+                (datetime.datetime(2012, 6, 1), datetime.datetime(2012, 6, 2)),
+                (datetime.datetime(2012, 2, 1), datetime.datetime(2012, 3, 1)),
+                (datetime.datetime(2013, 1, 5),
+                 datetime.datetime(2013, 2, 1))):
+            self.check(start, end)
+        result = self.stale.between(datetime.datetime(2012, 6, 1),
+                                    datetime.datetime(2012, 6, 2))
+        result_expected = [Interval(datetime.datetime(2012, 3, 1, 11),
+                                    datetime.datetime(2013, 1, 1))]
+        assert result.occurences == result_expected, "bad result ? got %s instead of %s" % (result.occurences, result_expected)
+
+
 if __name__ == "__main__":
     import sys
     suite = unittest.findTestCases(sys.modules[__name__])